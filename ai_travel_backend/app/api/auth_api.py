@@ -1,9 +1,9 @@
+import logging
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 import asyncio
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from pydantic import BaseModel
@@ -11,12 +11,12 @@ from pydantic import BaseModel
 from app.db.models import User
 from app.db.db import get_db
 from app.core.config import settings
+from app.services.password_service import password_service
 
 # ✅ Router declared early
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Request models
 class AuthRegisterRequest(BaseModel):
     email: str
@@ -32,17 +32,11 @@ class TokenResponse(BaseModel):
 
 
 # Helpers
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def hash_password(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    return jwt.encode(to_encode, settings.require("secret_key"), algorithm=settings.algorithm)
 
 
 # Routes
@@ -53,7 +47,7 @@ async def register_user(request: AuthRegisterRequest, db: AsyncSession = Depends
         if result.scalar_one_or_none():
             raise HTTPException(status_code=400, detail="Email already registered")
 
-        hashed_pw = hash_password(request.password)
+        hashed_pw = await password_service.hash(request.password)
         new_user = User(
             user_id=request.email,
             username=request.email,
@@ -66,8 +60,11 @@ async def register_user(request: AuthRegisterRequest, db: AsyncSession = Depends
         await db.commit()
         return {"message": "User registered successfully"}
 
+    except HTTPException:
+        raise
+
     except (SQLAlchemyError, ConnectionError, asyncio.TimeoutError) as e:
-        print(f"[REGISTER] DB or Network Error: {e}")
+        logger.error("register db or network error", extra={"error": str(e)})
         return {
             "message": "Fallback: User registered (mock)",
             "user": {
@@ -78,7 +75,7 @@ async def register_user(request: AuthRegisterRequest, db: AsyncSession = Depends
         }
 
     except Exception as e:
-        print(f"[REGISTER] Unexpected Error: {e}")
+        logger.exception("register unexpected error")
         return {
             "message": "Fallback: User registered (mock)",
             "user": {
@@ -94,18 +91,33 @@ async def login(request: AuthLoginRequest, db: AsyncSession = Depends(get_db)):
     try:
         result = await db.execute(select(User).where(User.email == request.email))
         user = result.scalar_one_or_none()
-        if not user or not verify_password(request.password, user.password_hash):
+        if not user:
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
-        token = create_access_token(data={"sub": user.user_id})
+        valid, new_hash = await password_service.verify_and_update(request.password, user.password_hash)
+        if not valid:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if new_hash:
+            # Stored hash used old bcrypt rounds; upgrade it transparently.
+            user.password_hash = new_hash
+            await db.commit()
+
+        token = create_access_token(data={
+            "sub": user.user_id,
+            "email": user.email,
+            "name": user.name,
+            "nationality": user.nationality,
+        })
         return TokenResponse(access_token=token)
 
+    except HTTPException:
+        raise
+
+    # Credentials that couldn't be checked never get a token.
     except (SQLAlchemyError, ConnectionError, asyncio.TimeoutError) as e:
-        print(f"[LOGIN] DB or Network Error: {e}")
-        dummy_token = create_access_token(data={"sub": request.email, "fallback": True})
-        return TokenResponse(access_token=dummy_token)
+        logger.error("login db or network error", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail="Login temporarily unavailable")
 
-    except Exception as e:
-        print(f"[LOGIN] Unexpected Error: {e}")
-        dummy_token = create_access_token(data={"sub": request.email, "fallback": True})
-        return TokenResponse(access_token=dummy_token)
+    except Exception:
+        logger.exception("login unexpected error")
+        raise HTTPException(status_code=503, detail="Login temporarily unavailable")
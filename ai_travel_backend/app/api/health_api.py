@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+from app.db.db import get_engine, pool_metrics
+
+router = APIRouter()
+
+
+@router.get("/health/db")
+async def db_pool_stats():
+    return pool_metrics.snapshot(get_engine().sync_engine.pool)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
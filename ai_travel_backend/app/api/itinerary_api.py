@@ -1,38 +1,267 @@
-from fastapi import APIRouter, HTTPException
-from app.models.itinerary import PromptRequest, FilterRequest, PackageResponse, SaveItineraryRequest, Package
-from app.services.itinerary_service import generate_packages_from_prompt, generate_packages_from_filters
-from typing import List
+import asyncio
+import json
+import logging
+import math
+import weakref
 
-router = APIRouter()
+import orjson
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.core.metrics import request_usage_var
+from app.core.responses import FastJSONResponse
+from app.db.db import get_db
+from app.dependencies.admission import get_admission_key
+from app.db.itinerary_store import save_itineraries, list_itineraries
+from app.models.itinerary import (
+    PromptRequest, FilterRequest, PackageResponse, SaveItineraryRequest, SaveItinerariesRequest, Package,
+    RegenerateDayRequest, BulkFilterResult,
+)
+from app.services.itinerary_service import (
+    generate_packages_from_prompt, generate_packages_from_filters,
+    stream_packages_from_prompt, stream_packages_from_filters,
+)
+from app.services.admission import AdmissionRejected, Slot, admission
+from app.services.itinerary_bulk import generate_bulk
+from app.services.itinerary_edit import regenerate_day
+from app.services.llm_router import CircuitOpenError
+from app.services.response_parser import ResponseParseError
+from typing import AsyncIterator, List, Tuple
 
+logger = logging.getLogger(__name__)
+router = APIRouter()
 
-# Temporary storage
-saved_itineraries = {}
 
 @router.post("/itinerary/save")
-def save_itinerary(request: SaveItineraryRequest):
-    if request.user_id not in saved_itineraries:
-        saved_itineraries[request.user_id] = []
-    saved_itineraries[request.user_id].append(request.selected_package)
+async def save_itinerary(request: SaveItineraryRequest, db: AsyncSession = Depends(get_db)):
+    try:
+        await save_itineraries(db, request.user_id, [request.selected_package])
+    except SQLAlchemyError as e:
+        logger.error("POST /itinerary/save db error", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail="Itinerary store unavailable")
     return {"message": "Itinerary saved successfully."}
 
+@router.post("/itinerary/save/batch")
+async def save_itinerary_batch(request: SaveItinerariesRequest, db: AsyncSession = Depends(get_db)):
+    try:
+        saved = await save_itineraries(db, request.user_id, request.packages)
+    except SQLAlchemyError as e:
+        logger.error("POST /itinerary/save/batch db error", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail="Itinerary store unavailable")
+    return {"message": f"{saved} itineraries saved successfully."}
+
 @router.get("/itinerary/{user_id}", response_model=List[Package])
-def get_saved_itineraries(user_id: str):
-    if user_id not in saved_itineraries or not saved_itineraries[user_id]:
+async def get_saved_itineraries(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        packages = await list_itineraries(db, user_id, limit=limit, offset=offset)
+    except SQLAlchemyError as e:
+        logger.error("GET /itinerary/{user_id} db error", extra={"user_id": user_id, "error": str(e)})
+        raise HTTPException(status_code=503, detail="Itinerary store unavailable")
+    if not packages and offset == 0:
         raise HTTPException(status_code=404, detail="No itineraries found for this user")
-    return saved_itineraries[user_id]
+    return FastJSONResponse(packages)
+
+# Generation endpoints take an admission slot first (see services/admission);
+# a rejected request gets a 429 before any work is done.
+def _too_many_requests(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429, detail=f"Too many requests ({e.reason})",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+async def admit(caller: str) -> Slot:
+    try:
+        return await admission.acquire(caller)
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+
 
 @router.post("/suggest-packages/prompt", response_model=PackageResponse)
-def suggest_from_prompt(request: PromptRequest):
+async def suggest_from_prompt(request: PromptRequest, caller: str = Depends(get_admission_key)):
+    slot = await admit(caller)
     try:
-        return generate_packages_from_prompt(request)
+        return FastJSONResponse(await generate_packages_from_prompt(request))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Itinerary generation timed out")
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Itinerary generation temporarily unavailable")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        slot.release()
 
 
 @router.post("/suggest-packages/filters", response_model=PackageResponse)
-def suggest_from_filters(request: FilterRequest):
+async def suggest_from_filters(request: FilterRequest, caller: str = Depends(get_admission_key)):
+    slot = await admit(caller)
+    try:
+        return FastJSONResponse(await generate_packages_from_filters(request))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Itinerary generation timed out")
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Itinerary generation temporarily unavailable")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        slot.release()
+
+
+# Rewrites one day (or one activity) of a package and returns the whole
+# package with that day replaced.
+@router.post("/itinerary/regenerate-day", response_model=Package)
+async def regenerate_itinerary_day(request: RegenerateDayRequest, caller: str = Depends(get_admission_key)):
+    slot = await admit(caller)
     try:
-        return generate_packages_from_filters(request)
+        return FastJSONResponse(await regenerate_day(request))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Itinerary generation timed out")
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Itinerary generation temporarily unavailable")
+    except ResponseParseError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        slot.release()
+
+
+# Server-sent events: one "package" event per validated package, then
+# "done" (or "error" if generation fails part-way).
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _package_events(packages: AsyncIterator[Package], slot: Slot) -> AsyncIterator[str]:
+    count = 0
+    try:
+        async for package in packages:
+            count += 1
+            yield _sse("package", package.model_dump_json())
+    except asyncio.TimeoutError:
+        yield _sse("error", json.dumps({"detail": "Itinerary generation timed out"}))
+        return
+    except Exception as e:
+        yield _sse("error", json.dumps({"detail": str(e)}))
+        return
+    finally:
+        slot.release()
+    if not count:
+        yield _sse("error", json.dumps({"detail": "No valid packages were generated"}))
+        return
+    # Headers are long gone by now, so the stream reports its own token usage.
+    yield _sse("done", json.dumps({"count": count, "usage": request_usage_var.get()}))
+
+
+def _event_stream(packages: AsyncIterator[Package], slot: Slot) -> StreamingResponse:
+    events = _package_events(packages, slot)
+    # A client that disconnects before the first chunk leaves the generator
+    # unstarted, so its finally never runs; the slot is released when the
+    # generator is collected instead.
+    weakref.finalize(events, slot.release)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/suggest-packages/prompt/stream")
+async def stream_from_prompt(request: PromptRequest, caller: str = Depends(get_admission_key)):
+    slot = await admit(caller)
+    return _event_stream(stream_packages_from_prompt(request), slot)
+
+
+@router.post("/suggest-packages/filters/stream")
+async def stream_from_filters(request: FilterRequest, caller: str = Depends(get_admission_key)):
+    slot = await admit(caller)
+    return _event_stream(stream_packages_from_filters(request), slot)
+
+
+# Bulk: a JSON array or NDJSON body (Content-Type: application/x-ndjson)
+# of FilterRequests. The response is NDJSON: one BulkFilterResult line per
+# item as it completes (invalid items first), then a {"done": ...} line.
+def _validation_detail(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}" for err in e.errors())
+
+
+def _item_error(e: BaseException) -> str:
+    if isinstance(e, AdmissionRejected):
+        return f"Too many requests ({e.reason})"
+    if isinstance(e, asyncio.TimeoutError):
+        return "Itinerary generation timed out"
+    if isinstance(e, CircuitOpenError):
+        return "Itinerary generation temporarily unavailable"
+    return str(e) or type(e).__name__
+
+
+async def _bulk_items(request: Request) -> Tuple[List[Tuple[int, FilterRequest]], List[BulkFilterResult]]:
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        raw_items = [line for line in body.splitlines() if line.strip()]
+        validate = FilterRequest.model_validate_json
+    else:
+        try:
+            raw_items = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            raw_items = None
+        if not isinstance(raw_items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON of filter requests")
+        validate = FilterRequest.model_validate
+    if not raw_items:
+        raise HTTPException(status_code=400, detail="No items")
+    if len(raw_items) > settings.bulk_max_items:
+        raise HTTPException(status_code=400, detail=f"At most {settings.bulk_max_items} items per request")
+
+    items, invalid = [], []
+    for index, raw in enumerate(raw_items):
+        try:
+            items.append((index, validate(raw)))
+        except ValidationError as e:
+            invalid.append(BulkFilterResult(index=index, ok=False, error=_validation_detail(e)))
+    return items, invalid
+
+
+async def _bulk_lines(
+    items: List[Tuple[int, FilterRequest]], invalid: List[BulkFilterResult], caller: str
+) -> AsyncIterator[bytes]:
+    for result in invalid:
+        yield result.model_dump_json().encode() + b"\n"
+    errors = len(invalid)
+    async for indices, response, error in generate_bulk(items, settings.bulk_concurrency, caller):
+        if error is not None:
+            logger.warning("bulk item failed", extra={"indices": indices, "error": repr(error)})
+            errors += len(indices)
+        for index in indices:
+            if error is None:
+                result = BulkFilterResult(index=index, ok=True, result=response)
+            else:
+                result = BulkFilterResult(index=index, ok=False, error=_item_error(error))
+            yield result.model_dump_json().encode() + b"\n"
+    count = len(items) + len(invalid)
+    yield orjson.dumps({"done": True, "count": count, "errors": errors, "usage": request_usage_var.get()}) + b"\n"
+
+
+@router.post("/suggest-packages/filters/bulk")
+async def suggest_bulk_from_filters(request: Request, caller: str = Depends(get_admission_key)):
+    items, invalid = await _bulk_items(request)
+    # One token from the caller's bucket per batch; each item then takes
+    # an admission slot while it runs (see services/itinerary_bulk).
+    try:
+        admission.charge(caller)
+    except AdmissionRejected as e:
+        raise _too_many_requests(e)
+    return StreamingResponse(
+        _bulk_lines(items, invalid, caller),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
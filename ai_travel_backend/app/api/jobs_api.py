@@ -0,0 +1,85 @@
+import logging
+import math
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.dependencies.admission import get_admission_key
+from app.models.itinerary import FilterRequest, JobStatus, PromptRequest
+from app.services.admission import AdmissionRejected, admission
+from app.services.job_queue import QueueFullError, job_broker
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+async def _submit(
+    kind: str, payload: dict, priority: int, callback_url: Optional[str], caller: str
+) -> FastJSONResponse:
+    if callback_url and not settings.jobs_allow_callbacks:
+        raise HTTPException(status_code=400, detail="Callbacks are disabled; poll the job instead")
+    # Jobs wait in their own queue, so only the per-user rate applies here.
+    try:
+        admission.charge(caller)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429, detail=f"Too many requests ({e.reason})",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    try:
+        job = await job_broker.submit(kind, payload, priority=priority, callback_url=callback_url)
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Job queue is full", headers={"Retry-After": "5"})
+    except SQLAlchemyError as e:
+        logger.error("job submit db error", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    return FastJSONResponse(job.to_status(), status_code=202, headers={"Location": f"/suggest-packages/jobs/{job.id}"})
+
+
+@router.post("/suggest-packages/prompt/jobs", response_model=JobStatus, status_code=202)
+async def submit_prompt_job(
+    request: PromptRequest,
+    priority: int = Query(0, ge=-10, le=10),
+    callback_url: Optional[str] = None,
+    caller: str = Depends(get_admission_key),
+):
+    return await _submit("prompt", request.model_dump(mode="json"), priority, callback_url, caller)
+
+
+@router.post("/suggest-packages/filters/jobs", response_model=JobStatus, status_code=202)
+async def submit_filters_job(
+    request: FilterRequest,
+    priority: int = Query(0, ge=-10, le=10),
+    callback_url: Optional[str] = None,
+    caller: str = Depends(get_admission_key),
+):
+    return await _submit("filters", request.model_dump(mode="json"), priority, callback_url, caller)
+
+
+# ?wait=N long-polls: the response comes back as soon as the job finishes,
+# or after N seconds with its current status.
+@router.get("/suggest-packages/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=settings.jobs_long_poll_max_seconds)):
+    try:
+        job = await job_broker.wait(job_id, wait) if wait else await job_broker.get(job_id)
+    except SQLAlchemyError as e:
+        logger.error("job lookup db error", extra={"job_id": job_id, "error": str(e)})
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(job.to_status())
+
+
+@router.delete("/suggest-packages/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    try:
+        job = await job_broker.cancel(job_id)
+    except SQLAlchemyError as e:
+        logger.error("job cancel db error", extra={"job_id": job_id, "error": str(e)})
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(job.to_status())
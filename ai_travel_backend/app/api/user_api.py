@@ -1,15 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
+import base64
+import binascii
+import hashlib
+import logging
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import asyncio
 
-from app.models.user import UserProfile
-from app.db.models import User
+from app.core.responses import FastJSONResponse
+from app.models.user import Principal, UserProfile, UserProfilePage
 from app.db.db import get_db
+from app.db.user_store import (
+    VersionedListing, get_listings, get_profile, get_profile_version, list_listings, update_profile,
+)
+from app.dependencies.auth import get_admin_user
+from app.services.user_cache import principal_cache
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+MAX_BULK_IDS = 200
+
 # ✅ Dummy Profile (used for fallbacks)
 def dummy_profile(user_id: str, email: str = "") -> UserProfile:
     return UserProfile(
@@ -27,99 +39,147 @@ def dummy_profile(user_id: str, email: str = "") -> UserProfile:
         preferred_languages=["English"]
     )
 
+
+# Conditional GET: profiles carry a version that every write bumps, so a
+# client holding the current ETag gets an empty 304 after a one-column
+# lookup instead of the profile.
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _page_etag(profiles: List[VersionedListing], next_cursor: Optional[str]) -> str:
+    versions = "|".join(f"{profile.user_id}:{version}" for profile, version in profiles)
+    return '"' + hashlib.sha256(f"{versions}|{next_cursor}".encode()).hexdigest()[:16] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def _etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=_etag_headers(etag))
+
+
+def _encode_cursor(user_id: str) -> str:
+    return base64.urlsafe_b64encode(user_id.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor.encode(), altchars=b"-_", validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _profile_values(profile: UserProfile, include_email: bool) -> dict:
+    values = profile.model_dump(exclude={"user_id", "email"})
+    if include_email:
+        values["email"] = profile.email
+    return values
+
+
 @router.post("/user/profile", response_model=UserProfile)
 async def create_or_update_profile(profile: UserProfile, db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(select(User).where(User.user_id == profile.user_id))
-        user = result.scalar_one_or_none()
-
-        if not user:
+        version = await update_profile(db, profile.user_id, **_profile_values(profile, include_email=False))
+        if version is None:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user.name = profile.name
-        user.nationality = profile.nationality
-        user.country_of_residence = profile.country_of_residence
-        user.passport_number = profile.passport_number
-        user.passport_expiry = profile.passport_expiry
-        user.has_visa = profile.has_visa
-        user.visa_expiry = profile.visa_expiry
-        user.travel_persona = profile.travel_persona
-        user.interests = ",".join(profile.interests)
-        user.preferred_languages = ",".join(profile.preferred_languages)
-
-        await db.commit()
-        return profile
+        await principal_cache.invalidate(profile.user_id)
+        return FastJSONResponse(profile, headers=_etag_headers(_etag(version)))
 
     except (SQLAlchemyError, ConnectionError, asyncio.TimeoutError) as e:
-        print(f"[POST /user/profile] DB or Network Error: {e}")
+        logger.error("POST /user/profile db or network error", extra={"error": str(e)})
         return dummy_profile(user_id=profile.user_id, email=profile.email)
 
     except Exception as e:
-        print(f"[POST /user/profile] Unexpected Error: {e}")
+        logger.exception("POST /user/profile unexpected error")
         return dummy_profile(user_id=profile.user_id, email=profile.email)
 
 
+# Admin/analytics reads (admin or service principals only): ?ids=a,b,c
+# fetches those users in one query; without ids, pages through every user
+# in user_id order. Passport and visa details are never listed.
+@router.get("/users", response_model=UserProfilePage)
+async def list_users(
+    ids: Optional[str] = Query(None, description="Comma-separated user ids"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    principal: Principal = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        if ids is not None:
+            user_ids = [user_id.strip() for user_id in ids.split(",") if user_id.strip()]
+            if len(user_ids) > MAX_BULK_IDS:
+                raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_IDS} ids per request")
+            profiles, next_cursor = await get_listings(db, user_ids), None
+        else:
+            after = _decode_cursor(cursor) if cursor else None
+            profiles = await list_listings(db, limit + 1, after=after)
+            next_cursor = _encode_cursor(profiles[limit - 1][0].user_id) if len(profiles) > limit else None
+            profiles = profiles[:limit]
+    except SQLAlchemyError as e:
+        logger.error("GET /users db error", extra={"error": str(e)})
+        raise HTTPException(status_code=503, detail="User store unavailable")
+
+    etag = _page_etag(profiles, next_cursor)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    page = UserProfilePage(items=[profile for profile, _ in profiles], next_cursor=next_cursor)
+    return FastJSONResponse(page, headers=_etag_headers(etag))
+
+
 @router.get("/user/{user_id}", response_model=UserProfile)
-async def get_user(user_id: str, db: AsyncSession = Depends(get_db)):
+async def get_user(
+    user_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        result = await db.execute(select(User).where(User.user_id == user_id))
-        user = result.scalar_one_or_none()
+        if if_none_match:
+            version = await get_profile_version(db, user_id)
+            if version is not None and _etag_matches(if_none_match, _etag(version)):
+                return _not_modified(_etag(version))
 
-        if user is None:
+        found = await get_profile(db, user_id)
+        if found is None:
             raise HTTPException(status_code=404, detail="User not found")
 
-        return UserProfile(
-            user_id=user.user_id,
-            name=user.name,
-            email=user.email,
-            nationality=user.nationality,
-            country_of_residence=user.country_of_residence,
-            passport_number=user.passport_number,
-            passport_expiry=user.passport_expiry,
-            has_visa=user.has_visa,
-            visa_expiry=user.visa_expiry,
-            travel_persona=user.travel_persona,
-            interests=user.interests.split(",") if user.interests else [],
-            preferred_languages=user.preferred_languages.split(",") if user.preferred_languages else [],
-        )
+        profile, version = found
+        return FastJSONResponse(profile, headers=_etag_headers(_etag(version)))
 
     except (SQLAlchemyError, ConnectionError, asyncio.TimeoutError) as e:
-        print(f"[GET /user/{user_id}] DB or Network Error: {e}")
+        logger.error("GET /user/{user_id} db or network error", extra={"user_id": user_id, "error": str(e)})
         return dummy_profile(user_id)
 
     except Exception as e:
-        print(f"[GET /user/{user_id}] Unexpected Error: {e}")
+        logger.exception("GET /user/{user_id} unexpected error", extra={"user_id": user_id})
         return dummy_profile(user_id)
 
 
 @router.put("/user/{user_id}", response_model=UserProfile)
 async def update_user(user_id: str, profile: UserProfile, db: AsyncSession = Depends(get_db)):
     try:
-        result = await db.execute(select(User).where(User.user_id == user_id))
-        user = result.scalar_one_or_none()
-
-        if user is None:
+        version = await update_profile(db, user_id, **_profile_values(profile, include_email=True))
+        if version is None:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user.name = profile.name
-        user.email = profile.email
-        user.nationality = profile.nationality
-        user.country_of_residence = profile.country_of_residence
-        user.passport_number = profile.passport_number
-        user.passport_expiry = profile.passport_expiry
-        user.has_visa = profile.has_visa
-        user.visa_expiry = profile.visa_expiry
-        user.travel_persona = profile.travel_persona
-        user.interests = ",".join(profile.interests)
-        user.preferred_languages = ",".join(profile.preferred_languages)
-
-        await db.commit()
-        return profile
+        await principal_cache.invalidate(user_id)
+        return FastJSONResponse(profile, headers=_etag_headers(_etag(version)))
 
     except (SQLAlchemyError, ConnectionError, asyncio.TimeoutError) as e:
-        print(f"[PUT /user/{user_id}] DB or Network Error: {e}")
+        logger.error("PUT /user/{user_id} db or network error", extra={"user_id": user_id, "error": str(e)})
         return dummy_profile(user_id, email=profile.email)
 
     except Exception as e:
-        print(f"[PUT /user/{user_id}] Unexpected Error: {e}")
+        logger.exception("PUT /user/{user_id} unexpected error", extra={"user_id": user_id})
         return dummy_profile(user_id, email=profile.email)
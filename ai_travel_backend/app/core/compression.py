@@ -0,0 +1,107 @@
+# app/core/compression.py
+
+import gzip
+import logging
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # gzip only
+    zstandard = None
+
+compression_bytes = registry.register(Counter(
+    "http_compression_bytes_total", "Response bytes before (in) and after (out) compression",
+    ("encoding", "stage"),
+))
+
+# Streamed responses go out as they are produced; they are never buffered
+# for compression.
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    # Highest-q encoding we support; zstd wins ties (smaller and cheaper).
+    supported = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+    wildcard = weights.get("*", 0.0)
+    ranked = [(weights.get(coding, wildcard), -i, coding) for i, coding in enumerate(supported)]
+    q, _, coding = max(ranked)
+    return coding if q > 0 else None
+
+
+class CompressionMiddleware:
+    # gzip/zstd by Accept-Encoding for complete responses of at least
+    # minimum_size bytes. Responses sent in several body chunks
+    # (StreamingResponse) pass through untouched.
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self._zstd = zstandard.ZstdCompressor(level=zstd_level) if zstandard is not None else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message  # held until the body shows whether to compress
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or not self._compressible(start, body):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compress(encoding, body)
+            compression_bytes.inc(len(body), encoding=encoding, stage="in")
+            compression_bytes.inc(len(compressed), encoding=encoding, stage="out")
+            headers = MutableHeaders(scope=start)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start: dict, body: bytes) -> bool:
+        if len(body) < self.minimum_size or start["status"] in (204, 304):
+            return False
+        headers = Headers(raw=start["headers"])
+        if "content-encoding" in headers:
+            return False
+        return not headers.get("content-type", "").startswith(STREAMING_TYPES)
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "zstd":
+            return self._zstd.compress(body)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
@@ -1,14 +1,154 @@
 # app/core/config.py
 
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 class Settings(BaseSettings):
-    openai_api_key: str
-    database_url: str
-    secret_key: str
+    # Secrets are checked where they are used (require()), so the app can
+    # import, start and answer health checks without them.
+    openai_api_key: Optional[str] = None
+    database_url: Optional[str] = None
+    secret_key: Optional[str] = None
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 10_000
+    auth_trust_token_claims: bool = False  # skip the DB entirely for tokens carrying identity claims
+    admin_user_ids: str = ""  # comma-separated; admin and service accounts allowed on GET /users
+
+    # Password hashing
+    bcrypt_rounds: int = 12  # changing this rehashes passwords on next login
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
+    password_hash_use_processes: bool = False
+
+    # Database engine
+    database_echo: bool = False
+    database_ssl: Optional[str] = "require"  # asyncpg ssl mode; empty to disable
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # seconds; below typical server idle timeouts
+    db_statement_cache_size: int = 500  # asyncpg prepared statements per connection
+    db_slow_query_ms: Optional[float] = 200.0  # log slower statements; unset to disable
+
+    # LLM client
+    openai_base_url: Optional[str] = None  # e.g. a local fake OpenAI server
+    llm_model: str = "gpt-4"
+    llm_temperature: float = 0.7
+    llm_timeout_seconds: float = 90.0  # per call, including retries and fallback
+    llm_max_retries: int = 2  # per tier, with exponential backoff
+    llm_retry_backoff_seconds: float = 0.5
+    llm_large_timeout_seconds: float = 60.0  # per attempt
+    llm_small_model: Optional[str] = None  # e.g. gpt-4o-mini; unset routes everything to llm_model
+    llm_small_base_url: Optional[str] = None  # defaults to openai_base_url
+    llm_small_timeout_seconds: float = 20.0  # per attempt
+    llm_small_max_days: int = 3  # trips up to this length go to the small model
+    llm_hedge_after_seconds: Optional[float] = None  # send a duplicate request after this long
+    llm_circuit_failures: int = 5  # consecutive failures before a tier's circuit opens
+    llm_circuit_reset_seconds: float = 30.0
+    llm_max_concurrency: int = 256  # in-flight LLM calls per worker
+    llm_fanout_enabled: bool = False  # one planner call + one call per package
+    llm_fanout_concurrency: int = 3  # per-package calls in flight per request
+    llm_max_output_tokens: int = 4096  # upper bound for the per-trip completion budget
+    llm_default_trip_days: int = 5  # budget for free-text prompts that don't state a length
+    llm_json_mode: bool = False  # response_format=json_object; needs a model that supports it
+    llm_preload: bool = False  # build LLM clients during startup instead of on the first call
+    tiktoken_cache_dir: Optional[str] = None  # tiktoken's BPE files; pre-populate it so startup never downloads them
+
+    # Itinerary response cache
+    cache_enabled: bool = True
+    cache_backend: str = "memory"  # memory / redis
+    cache_url: Optional[str] = None
+    cache_ttl_seconds: int = 6 * 60 * 60
+    cache_max_entries: int = 1024
+    coalesce_enabled: bool = True  # identical in-flight requests share one generation
+    intent_pipeline_enabled: bool = True  # free-text prompts go through intent extraction first
+    intent_cache_ttl_seconds: int = 24 * 60 * 60
+    intent_cache_max_entries: int = 10_000
+    similarity_cache_enabled: bool = True  # reuse plans for near-identical free-text prompts (needs the intent pipeline)
+    similarity_cache_threshold: float = 0.35  # cosine similarity of the prompts' TF-IDF vectors; see benchmarks.bench_similarity
+    similarity_cache_max_entries: int = 1000
+    similarity_cache_dim: int = 2048  # hashed feature buckets
+
+    # Destination knowledge base (weather, costs, transport, visa rules)
+    destination_kb_enabled: bool = True
+    destination_kb_path: Optional[str] = None  # defaults to the bundled app/data/destinations.json
+    destination_kb_lookup_timeout_seconds: float = 2.0  # traveller nationality lookup; slower -> visa_required unknown
+
+    # Background generation jobs
+    jobs_broker: str = "memory"  # memory (this process only) / database (shared with worker processes)
+    jobs_workers: int = 4  # in-process workers; 0 when only app.workers.itinerary_worker runs jobs
+    jobs_max_queued: int = 1000
+    jobs_result_ttl_seconds: int = 60 * 60
+    jobs_poll_interval_seconds: float = 0.5
+    jobs_long_poll_max_seconds: float = 30.0
+    jobs_lease_seconds: float = 120.0  # database broker: a running job whose worker stops renewing this long is requeued
+    jobs_allow_callbacks: bool = False  # callbacks POST to caller-supplied URLs; only enable for trusted clients
+
+    # Bulk generation (/suggest-packages/filters/bulk)
+    bulk_max_items: int = 500
+    bulk_concurrency: int = 8  # items generating at once per batch
+
+    # Admission control for generation endpoints (per-user rate, global cap, fair queue)
+    admission_enabled: bool = True
+    admission_max_active: int = 16  # per worker; ~ OpenAI RPM x average call seconds / 60 / workers
+    admission_max_queued: int = 200  # waiting requests across all users
+    admission_max_wait_seconds: float = 10.0  # queued longer than this -> 429
+    admission_user_rate_per_minute: float = 6.0  # token bucket refill per user
+    admission_user_burst: int = 3
+    admission_user_max_pending: int = 3  # running + queued per user
+    admission_max_tracked_users: int = 10_000
+
+    # Response compression (gzip/zstd by Accept-Encoding; streams are never compressed)
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_zstd_level: int = 3
+
+    # Logging
+    log_level: str = "INFO"
+    log_format: str = "json"  # json / text
+    log_queue_size: int = 10_000  # records beyond this are dropped, never blocked on
+    log_llm_body_max_chars: int = 500  # preview length for LLM request/response bodies
+    log_llm_body_sample_rate: float = 0.0  # fraction of LLM records carrying the full body
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
+    def require(self, name: str) -> str:
+        value = getattr(self, name)
+        if not value:
+            raise RuntimeError(f"{name.upper()} is not set")
+        return value
+
+    def create_engine(self, queue_pool_class=None, **overrides) -> AsyncEngine:
+        url = make_url(self.require("database_url"))
+        options = {"echo": self.database_echo, "future": True}
+        connect_args = {}
+
+        if url.drivername.startswith("postgresql+asyncpg"):
+            url = url.update_query_dict({"prepared_statement_cache_size": str(self.db_statement_cache_size)})
+            connect_args["statement_cache_size"] = self.db_statement_cache_size
+            if self.database_ssl:
+                connect_args["ssl"] = self.database_ssl
+
+        if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+            options.update(
+                pool_size=self.db_pool_size,
+                max_overflow=self.db_max_overflow,
+                pool_timeout=self.db_pool_timeout,
+                pool_pre_ping=self.db_pool_pre_ping,
+                pool_recycle=self.db_pool_recycle,
+            )
+            if queue_pool_class is not None:
+                options["poolclass"] = queue_pool_class
+
+        options["connect_args"] = connect_args
+        options.update(overrides)
+        return create_async_engine(url, **options)
+
 settings = Settings()
@@ -0,0 +1,112 @@
+# app/core/logging.py
+#
+# Handlers never write on the request path: records go onto a bounded queue
+# and a QueueListener thread formats and writes them. When the queue is full
+# records are dropped (and counted) rather than blocking the event loop.
+
+import atexit
+import hashlib
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import Gauge, registry, request_id_var
+
+# Attributes every LogRecord has; anything else came in through extra=.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+
+class DroppingQueueHandler(QueueHandler):
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Captured here, on the caller's task, where the contextvar is set.
+        record.request_id = request_id_var.get()
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+    log_queue = queue.Queue(maxsize=settings.log_queue_size)
+
+    # LOG_LEVEL applies to our own loggers; libraries stay at WARNING so
+    # DEBUG doesn't turn on SQLAlchemy/aiosqlite/httpx internals.
+    root = logging.getLogger()
+    root.handlers = [DroppingQueueHandler(log_queue)]
+    root.setLevel(logging.WARNING)
+    logging.getLogger("app").setLevel(settings.log_level.upper())
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # flushes what is still queued
+        _listener = None
+
+
+def summarize_payload(text: Optional[str]) -> dict:
+    # LLM bodies are multi-KB: log their size, a hash to correlate identical
+    # outputs, and a truncated preview. The full body is kept only for a
+    # sampled fraction of records.
+    text = text or ""
+    summary = {
+        "length": len(text),
+        "sha256": hashlib.sha256(text.encode()).hexdigest()[:16],
+        "preview": text[: settings.log_llm_body_max_chars],
+    }
+    if settings.log_llm_body_sample_rate and random.random() < settings.log_llm_body_sample_rate:
+        summary["body"] = text
+    return summary
+
+
+registry.register(Gauge(
+    "log_records_dropped_total", "Log records dropped because the log queue was full",
+    lambda: {(): DroppingQueueHandler.dropped}, kind="counter",
+))
@@ -0,0 +1,156 @@
+# app/core/metrics.py
+#
+# Small in-process metrics registry rendered in the Prometheus text format,
+# plus request-scoped spans. Kept dependency-free on purpose: each worker
+# exposes its own /metrics and the scraper aggregates.
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Set by RequestContextMiddleware for the lifetime of each HTTP request.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_scope_var: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+request_spans_var: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+request_usage_var: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_usage", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    # Read at scrape time from a callback returning {label values tuple: value};
+    # kind="counter" for monotonic values kept elsewhere (e.g. cache hits).
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[tuple, float]], labelnames=(), kind="gauge"):
+        self.name, self.help, self.labelnames, self.collect = name, help, tuple(labelnames), collect
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")))
+http_request_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+span_seconds = registry.register(Histogram(
+    "app_span_duration_seconds", "Time spent in instrumented code paths", ("span", "route")))
+llm_tokens = registry.register(Counter(
+    "llm_tokens_total", "LLM tokens used", ("route", "kind")))
+
+
+def current_route() -> str:
+    scope = request_scope_var.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def record_span(name: str, elapsed: float) -> None:
+    span_seconds.observe(elapsed, span=name, route=current_route())
+    spans = request_spans_var.get()
+    if spans is not None:
+        spans.append((name, elapsed))
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def record_token_usage(message) -> None:
+    # message is a LangChain AIMessage / AIMessageChunk
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    route = current_route()
+    prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    llm_tokens.inc(prompt, route=route, kind="prompt")
+    llm_tokens.inc(completion, route=route, kind="completion")
+    totals = request_usage_var.get()
+    if totals is not None:
+        totals["prompt"] += prompt
+        totals["completion"] += completion
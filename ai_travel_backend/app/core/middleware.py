@@ -0,0 +1,73 @@
+# app/core/middleware.py
+
+import logging
+import time
+import uuid
+from collections import defaultdict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.metrics import (
+    current_route, http_request_seconds, http_requests,
+    request_id_var, request_scope_var, request_spans_var, request_usage_var,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestContextMiddleware:
+    # Assigns a request ID (honouring an incoming X-Request-ID), collects the
+    # spans recorded while handling the request and returns them as a
+    # Server-Timing header, reports the request's LLM token usage as
+    # X-LLM-Usage, and records per-route request metrics.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex
+        spans = []
+        usage = {"prompt": 0, "completion": 0}
+        status = [500]
+        tokens = (
+            request_id_var.set(request_id),
+            request_scope_var.set(scope),
+            request_spans_var.set(spans),
+            request_usage_var.set(usage),
+        )
+
+        async def send_with_context(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                if spans:
+                    headers.append("Server-Timing", _server_timing(spans))
+                if usage["prompt"] or usage["completion"]:
+                    headers.append("X-LLM-Usage", f"prompt={usage['prompt']}, completion={usage['completion']}")
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_context)
+        finally:
+            route = current_route()
+            http_requests.inc(method=scope["method"], route=route, status=status[0])
+            http_request_seconds.observe(time.perf_counter() - start, method=scope["method"], route=route)
+            if usage["prompt"] or usage["completion"]:
+                logger.info("llm usage", extra={"route": route, "prompt_tokens": usage["prompt"],
+                                                "completion_tokens": usage["completion"]})
+            request_usage_var.reset(tokens[3])
+            request_spans_var.reset(tokens[2])
+            request_scope_var.reset(tokens[1])
+            request_id_var.reset(tokens[0])
+
+
+def _server_timing(spans) -> str:
+    totals = defaultdict(float)
+    for name, elapsed in spans:
+        totals[name] += elapsed
+    return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in totals.items())
@@ -0,0 +1,29 @@
+# app/core/responses.py
+#
+# When a handler returns a model, FastAPI dumps it to a dict, validates
+# that again against response_model, serializes it once more and runs
+# json.dumps. Models built by the service layer are already valid, so
+# handlers wrap them in FastJSONResponse instead: response_model still
+# documents the route, but the body is serialized once, straight to bytes.
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # pydantic-core's serializer is faster than model_dump() + orjson
+        # for a single model; orjson handles everything else (lists of
+        # models, dicts, dates).
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        return orjson.dumps(content, default=_default)
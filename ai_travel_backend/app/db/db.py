@@ -1,28 +1,158 @@
 # app/db.py
-import os
+import logging
+import time
+from typing import Optional
+from sqlalchemy import event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from dotenv import load_dotenv
-from sqlalchemy.engine.url import make_url
-load_dotenv()  # Load .env
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+from app.core.config import settings
+from app.core.metrics import Gauge, record_span, registry
 
-#engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+logger = logging.getLogger(__name__)
 
-url = make_url(DATABASE_URL)
-engine = create_async_engine(
-    url,
-    connect_args={"ssl": "require"},
-    echo=True,
-    future=True
-)
 
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+class PoolMetrics:
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.slow_queries = 0
+
+    def record_wait(self, seconds: float):
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self, pool) -> dict:
+        stats = {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            "slow_queries": self.slow_queries,
+        }
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    # Times how long callers wait for a connection (including pool_timeout).
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+# SQLAlchemy names pool loggers after the pool class, which puts this one
+# under app.* and LOG_LEVEL; keep its checkout chatter out of DEBUG logs.
+logging.getLogger(f"{__name__}.InstrumentedPool").setLevel(logging.WARNING)
+
+_engine: Optional[AsyncEngine] = None
+
+
+def get_engine() -> AsyncEngine:
+    # Created on first use rather than at import, so importing the app
+    # needs neither DATABASE_URL nor the driver.
+    global _engine
+    if _engine is None:
+        _engine = settings.create_engine(queue_pool_class=InstrumentedPool)
+        _instrument(_engine)
+    return _engine
+
+
+async def dispose_engine() -> None:
+    if _engine is not None:
+        await _engine.dispose()
+
+
+class _LazySessionmaker(sessionmaker):
+    # Binds to the engine the first time a session is opened.
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+AsyncSessionLocal = _LazySessionmaker(class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
 
+
+def _instrument(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "connect", _on_connect)
+    event.listen(engine.sync_engine.pool, "checkout", _on_checkout)
+    event.listen(engine.sync_engine.pool, "checkin", _on_checkin)
+    event.listen(engine.sync_engine, "before_cursor_execute", _start_query_timer)
+    event.listen(engine.sync_engine, "after_cursor_execute", _record_query)
+
+
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.connects += 1
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.checkouts += 1
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    pool_metrics.checkins += 1
+
+
+# Every statement is timed as a "db.execute" span; slow ones are also
+# logged, instead of echoing every statement. The start time lives on the
+# statement's execution context, so a statement that fails (and never
+# reaches after_cursor_execute) leaves nothing behind on the connection.
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    record_span("db.execute", elapsed)
+    if settings.db_slow_query_ms is not None and elapsed * 1000 >= settings.db_slow_query_ms:
+        pool_metrics.slow_queries += 1
+        logger.warning("slow query", extra={"elapsed_ms": round(elapsed * 1000), "statement": statement[:300]})
+
+
+def _pool_gauges() -> dict:
+    if _engine is None:
+        return {}
+    snapshot = pool_metrics.snapshot(_engine.sync_engine.pool)
+    return {(name,): snapshot[name] for name in ("size", "checked_out", "overflow") if name in snapshot}
+
+
+registry.register(Gauge("db_pool_connections", "Connection pool state", _pool_gauges, labelnames=("state",)))
+registry.register(Gauge(
+    "db_pool_checkout_wait_seconds_total", "Total time spent waiting for a pooled connection",
+    lambda: {(): pool_metrics.wait_seconds_total}, kind="counter",
+))
+
 # Dependency for FastAPI
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -1,10 +1,13 @@
-from app.db.db import engine
+from app.db.db import dispose_engine, get_engine
+from app.db.migrations import upgrade
 from app.db.models import Base
 import asyncio
 
 async def init_db():
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await upgrade(conn)
+    await dispose_engine()
 
 # Entry point
 if __name__ == "__main__":
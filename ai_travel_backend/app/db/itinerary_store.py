@@ -0,0 +1,38 @@
+# app/db/itinerary_store.py
+
+from typing import List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import SavedItinerary
+from app.models.itinerary import Package
+
+
+async def save_itineraries(db: AsyncSession, user_id: str, packages: List[Package]) -> int:
+    # One executemany INSERT for the whole batch.
+    rows = [
+        {
+            "user_id": user_id,
+            "package_id": package.package_id,
+            "title": package.title,
+            "package": package.model_dump(mode="json"),
+        }
+        for package in packages
+    ]
+    if rows:
+        await db.execute(insert(SavedItinerary), rows)
+        await db.commit()
+    return len(rows)
+
+
+async def list_itineraries(db: AsyncSession, user_id: str, limit: int, offset: int = 0) -> List[Package]:
+    result = await db.execute(
+        select(SavedItinerary.package)
+        .where(SavedItinerary.user_id == user_id)
+        .order_by(SavedItinerary.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return [Package.model_validate(document) for document in result.scalars()]
@@ -0,0 +1,127 @@
+# app/db/job_store.py
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import ItineraryJob
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+async def count_queued(db: AsyncSession) -> int:
+    result = await db.execute(select(func.count()).select_from(ItineraryJob).where(ItineraryJob.status == "queued"))
+    return result.scalar_one()
+
+
+async def insert_job(db: AsyncSession, **values) -> None:
+    await db.execute(insert(ItineraryJob), [values])
+    await db.commit()
+
+
+async def get_job(db: AsyncSession, job_id: str) -> Optional[ItineraryJob]:
+    result = await db.execute(select(ItineraryJob).where(ItineraryJob.id == job_id))
+    return result.scalar_one_or_none()
+
+
+async def claim_job(db: AsyncSession, now: datetime) -> Optional[ItineraryJob]:
+    # One statement picks and marks the next job. On Postgres SKIP LOCKED
+    # lets several workers claim concurrently without blocking each other;
+    # SQLite serialises writers and ignores the locking clause.
+    next_id = (
+        select(ItineraryJob.id)
+        .where(ItineraryJob.status == "queued")
+        .order_by(ItineraryJob.priority.desc(), ItineraryJob.created_at, ItineraryJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(ItineraryJob)
+        .where(ItineraryJob.id == next_id, ItineraryJob.status == "queued")
+        .values(status="running", started_at=now, claimed_at=now)
+        .returning(ItineraryJob)
+        .execution_options(synchronize_session=False)
+    )
+    job = result.scalar_one_or_none()
+    await db.commit()
+    return job
+
+
+async def requeue_expired(db: AsyncSession, claimed_before: datetime) -> int:
+    # Running jobs whose worker stopped renewing its lease (crashed, or
+    # killed without a clean shutdown) go back on the queue. Rows claimed
+    # before claimed_at existed fall back to started_at.
+    result = await db.execute(
+        update(ItineraryJob)
+        .where(
+            ItineraryJob.status == "running",
+            func.coalesce(ItineraryJob.claimed_at, ItineraryJob.started_at) < claimed_before,
+        )
+        .values(status="queued", started_at=None, claimed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def renew_claim(db: AsyncSession, job_id: str, now: datetime) -> None:
+    await db.execute(
+        update(ItineraryJob)
+        .where(ItineraryJob.id == job_id, ItineraryJob.status == "running")
+        .values(claimed_at=now)
+    )
+    await db.commit()
+
+
+async def finish_job(
+    db: AsyncSession, job_id: str, status: str, now: datetime, result: Optional[dict] = None, error: Optional[str] = None
+) -> None:
+    await db.execute(
+        update(ItineraryJob)
+        .where(ItineraryJob.id == job_id)
+        .values(status=status, finished_at=now, result=result, error=error)
+    )
+    await db.commit()
+
+
+async def requeue_job(db: AsyncSession, job_id: str) -> None:
+    await db.execute(
+        update(ItineraryJob)
+        .where(ItineraryJob.id == job_id, ItineraryJob.status == "running")
+        .values(status="queued", started_at=None, claimed_at=None)
+    )
+    await db.commit()
+
+
+async def cancel_job(db: AsyncSession, job_id: str, now: datetime) -> None:
+    # Queued jobs are cancelled outright; running ones are flagged and the
+    # worker running them stops the generation.
+    await db.execute(
+        update(ItineraryJob)
+        .where(ItineraryJob.id == job_id, ItineraryJob.status == "queued")
+        .values(status="cancelled", finished_at=now)
+    )
+    await db.execute(
+        update(ItineraryJob)
+        .where(ItineraryJob.id == job_id, ItineraryJob.status == "running")
+        .values(cancel_requested=True)
+    )
+    await db.commit()
+
+
+async def is_cancel_requested(db: AsyncSession, job_id: str) -> bool:
+    result = await db.execute(select(ItineraryJob.cancel_requested).where(ItineraryJob.id == job_id))
+    return bool(result.scalar_one_or_none())
+
+
+async def purge_jobs(db: AsyncSession, finished_before: datetime) -> int:
+    result = await db.execute(
+        delete(ItineraryJob)
+        .where(ItineraryJob.status.in_(TERMINAL_STATUSES), ItineraryJob.finished_at < finished_before)
+    )
+    await db.commit()
+    return result.rowcount
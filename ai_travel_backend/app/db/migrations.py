@@ -0,0 +1,85 @@
+# app/db/migrations.py
+#
+# In-place upgrades for databases created before a schema change;
+# create_all() only creates missing tables. Each step checks the live
+# schema first, so running them again is a no-op.
+#
+#   python -m app.db.migrations
+
+import asyncio
+import json
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.db import dispose_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+LIST_COLUMNS = ("interests", "preferred_languages")
+
+
+async def upgrade_user_profiles(conn: AsyncConnection) -> None:
+    # users.interests / preferred_languages: comma-separated text -> arrays
+    # (JSON on SQLite); adds users.profile_version.
+    columns = await conn.run_sync(lambda sync: {c["name"]: c["type"] for c in inspect(sync).get_columns("users")})
+
+    if "profile_version" not in columns:
+        await conn.execute(text("ALTER TABLE users ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 1"))
+        logger.info("added users.profile_version")
+
+    for column in LIST_COLUMNS:
+        if conn.dialect.name == "postgresql":
+            if isinstance(columns[column], ARRAY):
+                continue
+            await conn.execute(text(
+                f"ALTER TABLE users ALTER COLUMN {column} TYPE varchar[] "
+                f"USING CASE WHEN {column} IS NULL OR {column} = '' THEN NULL "
+                f"ELSE string_to_array({column}, ',') END"
+            ))
+            logger.info("converted users column to an array", extra={"column": column})
+            continue
+
+        # SQLite keeps the column and stores JSON text; rewrite old values.
+        rows = (await conn.execute(text(
+            f"SELECT user_id, {column} FROM users WHERE {column} IS NOT NULL AND {column} NOT LIKE '[%'"
+        ))).all()
+        for user_id, value in rows:
+            await conn.execute(
+                text(f"UPDATE users SET {column} = :value WHERE user_id = :user_id"),
+                {"value": json.dumps(value.split(",")) if value else None, "user_id": user_id},
+            )
+        if rows:
+            logger.info("converted users column to JSON lists", extra={"column": column, "rows": len(rows)})
+
+
+async def upgrade_itinerary_jobs(conn: AsyncConnection) -> None:
+    # Adds itinerary_jobs.claimed_at (worker leases).
+    def columns(sync):
+        inspector = inspect(sync)
+        if not inspector.has_table("itinerary_jobs"):
+            return None
+        return {c["name"] for c in inspector.get_columns("itinerary_jobs")}
+
+    existing = await conn.run_sync(columns)
+    if existing is not None and "claimed_at" not in existing:
+        column_type = "TIMESTAMP WITH TIME ZONE" if conn.dialect.name == "postgresql" else "DATETIME"
+        await conn.execute(text(f"ALTER TABLE itinerary_jobs ADD COLUMN claimed_at {column_type}"))
+        logger.info("added itinerary_jobs.claimed_at")
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    await upgrade_user_profiles(conn)
+    await upgrade_itinerary_jobs(conn)
+
+
+async def main():
+    async with get_engine().begin() as conn:
+        await upgrade(conn)
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,7 @@
 # app/db/models.py
 
-from sqlalchemy import Column, String, Date, Boolean, DateTime, func
+from sqlalchemy import Column, String, Date, Boolean, DateTime, Integer, JSON, Index, Text, func
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from app.db.db import Base
 
 class User(Base):
@@ -16,8 +17,44 @@ class User(Base):
     has_visa = Column(Boolean, default=False)
     visa_expiry = Column(Date, nullable=True)
     travel_persona = Column(String, default="flexible")
-    interests = Column(String, nullable=True)  # Comma-separated
-    preferred_languages = Column(String, nullable=True)  # Comma-separated
+    interests = Column(JSON().with_variant(ARRAY(String), "postgresql"), nullable=True)  # list of strings
+    preferred_languages = Column(JSON().with_variant(ARRAY(String), "postgresql"), nullable=True)
+    profile_version = Column(Integer, nullable=False, default=1, server_default="1")  # bumped on every profile write
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     username = Column(String, unique=True, nullable=False)
-    password_hash = Column(String, nullable=False)
\ No newline at end of file
+    password_hash = Column(String, nullable=False)
+
+
+class SavedItinerary(Base):
+    __tablename__ = "saved_itineraries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False)
+    package_id = Column(String, nullable=True)
+    title = Column(String, nullable=True)
+    package = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)  # Package document
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Listing is always "this user's itineraries, oldest first", paged by id.
+    __table_args__ = (Index("ix_saved_itineraries_user_id_id", "user_id", "id"),)
+
+
+class ItineraryJob(Base):
+    __tablename__ = "itinerary_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String, nullable=False)  # prompt / filters
+    payload = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)  # the request body
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="queued")
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    callback_url = Column(String, nullable=True)
+    result = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)  # PackageResponse document
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # the running worker's lease, renewed while it works
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Workers claim "highest priority, oldest first" among queued jobs.
+    __table_args__ = (Index("ix_itinerary_jobs_status_priority", "status", "priority", "created_at"),)
@@ -0,0 +1,104 @@
+# app/db/user_store.py
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.db.models import User
+from app.models.user import UserListing, UserProfile
+
+# Everything a profile read returns; password_hash and username are never
+# selected.
+PROFILE_COLUMNS = (
+    User.user_id,
+    User.name,
+    User.email,
+    User.nationality,
+    User.country_of_residence,
+    User.passport_number,
+    User.passport_expiry,
+    User.has_visa,
+    User.visa_expiry,
+    User.travel_persona,
+    User.interests,
+    User.preferred_languages,
+    User.profile_version,
+)
+
+# What bulk reads and listings return: no passport or visa details.
+LISTING_COLUMNS = (
+    User.user_id,
+    User.name,
+    User.email,
+    User.nationality,
+    User.country_of_residence,
+    User.travel_persona,
+    User.interests,
+    User.preferred_languages,
+    User.profile_version,
+)
+
+# A profile and its version (the ETag of GET /user/{user_id})
+VersionedProfile = Tuple[UserProfile, int]
+VersionedListing = Tuple[UserListing, int]
+
+
+def _values(row) -> dict:
+    values = dict(row._mapping)
+    values.pop("profile_version")
+    values["interests"] = values["interests"] or []
+    values["preferred_languages"] = values["preferred_languages"] or []
+    return values
+
+
+def _profile(row) -> UserProfile:
+    return UserProfile(**_values(row))
+
+
+def _listing(row) -> UserListing:
+    return UserListing(**_values(row))
+
+
+async def get_profile(db: AsyncSession, user_id: str) -> Optional[VersionedProfile]:
+    result = await db.execute(select(*PROFILE_COLUMNS).where(User.user_id == user_id))
+    row = result.one_or_none()
+    return (_profile(row), row.profile_version) if row is not None else None
+
+
+async def get_profile_version(db: AsyncSession, user_id: str) -> Optional[int]:
+    result = await db.execute(select(User.profile_version).where(User.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+async def get_listings(db: AsyncSession, user_ids: List[str]) -> List[VersionedListing]:
+    # One query for the batch, returned in the order asked for; unknown ids
+    # are left out.
+    result = await db.execute(select(*LISTING_COLUMNS).where(User.user_id.in_(user_ids)))
+    found = {row.user_id: (_listing(row), row.profile_version) for row in result}
+    return [found[user_id] for user_id in dict.fromkeys(user_ids) if user_id in found]
+
+
+async def list_listings(db: AsyncSession, limit: int, after: Optional[str] = None) -> List[VersionedListing]:
+    # Keyset pagination on the primary key: each page is an index range
+    # scan however deep the caller has paged.
+    query = select(*LISTING_COLUMNS).order_by(User.user_id).limit(limit)
+    if after is not None:
+        query = query.where(User.user_id > after)
+    result = await db.execute(query)
+    return [(_listing(row), row.profile_version) for row in result]
+
+
+async def update_profile(db: AsyncSession, user_id: str, **values) -> Optional[int]:
+    # Single UPDATE; returns the new version, or None for an unknown user.
+    result = await db.execute(
+        update(User)
+        .where(User.user_id == user_id)
+        .values(**values, profile_version=User.profile_version + 1)
+        .returning(User.profile_version)
+        .execution_options(synchronize_session=False)
+    )
+    version = result.scalar_one_or_none()
+    await db.commit()
+    return version
@@ -0,0 +1,18 @@
+from typing import Optional
+
+from fastapi import Depends, Request
+
+from app.dependencies.auth import optional_oauth2_scheme, token_subject
+
+
+async def get_admission_key(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)) -> str:
+    # Who admission control rate-limits and queues: the signed-in user, or
+    # the client address for anonymous calls (run uvicorn with
+    # --proxy-headers behind a proxy so this is the real client). The
+    # generation endpoints don't require a login, so a bad or expired token
+    # (the frontend sends "Bearer undefined" when logged out) counts as
+    # anonymous, and the key never needs the database.
+    user_id = token_subject(token)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
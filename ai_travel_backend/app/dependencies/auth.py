@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -7,10 +9,32 @@ from sqlalchemy.future import select
 from app.db.models import User
 from app.db.db import get_db
 from app.core.config import settings
+from app.models.user import Principal
+from app.services.user_cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
+    return await _principal_from_token(token, db)
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+
+def token_subject(token: Optional[str]) -> Optional[str]:
+    # The user a token was issued to, checking only its signature and
+    # expiry (no DB lookup); None for a missing, invalid or expired token,
+    # or when no secret is configured.
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.require("secret_key"), algorithms=[settings.algorithm])
+    except (JWTError, RuntimeError):
+        return None
+    if payload.get("fallback"):
+        return None
+    return payload.get("sub")
+
+
+async def _principal_from_token(token: str, db: AsyncSession) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -18,15 +42,48 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
     )
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, settings.require("secret_key"), algorithms=[settings.algorithm])
         user_id: str = payload.get("sub")
-        if user_id is None:
+        # Tokens minted by the old login fallback never had their password
+        # checked.
+        if user_id is None or payload.get("fallback"):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.user_id == user_id))
-    user = result.scalar_one_or_none()
-    if user is None:
+    # Signed identity claims are as trustworthy as the token itself; they
+    # may lag a profile edit until the token expires.
+    if settings.auth_trust_token_claims and "email" in payload:
+        return Principal(
+            user_id=user_id,
+            email=payload["email"],
+            name=payload.get("name"),
+            nationality=payload.get("nationality"),
+        )
+
+    principal = await principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    result = await db.execute(
+        select(User.user_id, User.email, User.name, User.nationality).where(User.user_id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
         raise credentials_exception
-    return user
+
+    principal = Principal(**row._mapping)
+    await principal_cache.set(principal)
+    return principal
+
+
+def _admin_user_ids() -> set:
+    return {user_id.strip() for user_id in settings.admin_user_ids.split(",") if user_id.strip()}
+
+
+async def get_admin_user(principal: Principal = Depends(get_current_user)) -> Principal:
+    # Anyone can register, so being signed in isn't enough for reads
+    # across users.
+    if principal.user_id not in _admin_user_ids():
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return principal
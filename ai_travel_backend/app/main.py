@@ -1,14 +1,38 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.logging import setup_logging
+from app.core.middleware import RequestContextMiddleware
+from app.core.responses import FastJSONResponse
 from app.api.user_api import router as user_router
 from app.api.itinerary_api import router as itinerary_router
 from app.api.auth_api import router as auth_router
+from app.api.health_api import router as health_router
+from app.api.jobs_api import router as jobs_router
+from app.db.db import dispose_engine
+from app.services.destination_kb import destination_index
+from app.services.job_queue import worker_pool
+from app.services.llm_router import router as llm_router
+from app.services.prompts import preload_tokenizer
+
+
+# The DB engine and LLM clients are created on first use rather than at
+# import, so a worker starts quickly (and starts at all without secrets).
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    destination_index()  # parse the knowledge base before the first request needs it
+    await asyncio.to_thread(preload_tokenizer)  # may download tiktoken's BPE file
+    if settings.llm_preload:
+        await asyncio.to_thread(llm_router.preload)
+    worker_pool.start()  # no-op with JOBS_WORKERS=0
+    yield
+    await worker_pool.stop()
+    await dispose_engine()
 
-app = FastAPI(
-    title="AITravelAgent API",
-    description="Mood-based travel assistant using OpenAI",
-    version="1.0.0"
-)
 
 # 👇 Add this CORS block before including routers
 origins = [
@@ -17,15 +41,46 @@ origins = [
     "https://horizon-ai-planner.lovable.app",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(user_router)
-app.include_router(itinerary_router)
-app.include_router(auth_router)
+
+def create_app() -> FastAPI:
+    setup_logging()
+
+    app = FastAPI(
+        title="AITravelAgent API",
+        description="Mood-based travel assistant using OpenAI",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Request-ID", "Server-Timing", "X-LLM-Usage"],
+    )
+
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_min_bytes,
+            gzip_level=settings.compression_gzip_level,
+            zstd_level=settings.compression_zstd_level,
+        )
+
+    # Outermost, so request timing covers CORS and every router
+    app.add_middleware(RequestContextMiddleware)
+
+    # Include routers
+    app.include_router(user_router)
+    app.include_router(itinerary_router)
+    app.include_router(auth_router)
+    app.include_router(health_router)
+    app.include_router(jobs_router)
+    return app
+
+
+# uvicorn app.main:app, or uvicorn --factory app.main:create_app
+app = create_app()
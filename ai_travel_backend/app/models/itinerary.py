@@ -1,6 +1,6 @@
 from typing import List, Optional
-from pydantic import BaseModel, Field
-from datetime import date
+from pydantic import BaseModel, Field, model_validator
+from datetime import date, datetime
 
 
 # For prompt-based requests (Tab 1)
@@ -34,6 +34,27 @@ class DayPlan(BaseModel):
     activities: List[Activity]
 
 
+# One entry of the fan-out planner's reply (itinerary_fanout)
+class PackagePlan(BaseModel):
+    title: str = Field(min_length=1)
+    theme: str = ""
+
+
+# Structured intent pulled out of a free-text prompt (first stage of /suggest-packages/prompt)
+class TravelIntent(BaseModel):
+    destination: Optional[str] = None
+    mood: Optional[str] = None  # adventurous / relaxing / romantic ...
+    interests: List[str] = Field(default_factory=list)
+    travel_type: Optional[str] = None  # solo / couple / family / group
+    duration_days: Optional[int] = None
+    preferred_month: Optional[str] = None
+    budget: Optional[str] = None
+
+    def is_usable(self) -> bool:
+        # Enough to write a compact brief instead of passing the raw prompt on.
+        return bool(self.destination or self.mood or self.interests)
+
+
 # Each travel package
 class Package(BaseModel):
     package_id: str
@@ -41,8 +62,8 @@ class Package(BaseModel):
     days: List[DayPlan]
     total_cost_estimate: Optional[str]
     accommodation: Optional[dict]
-    local_transport: Optional[List[str]]
-    visa_required: Optional[bool]
+    local_transport: Optional[List[str]] = None  # may come from the destination knowledge base
+    visa_required: Optional[bool] = None
     notes: Optional[str] = None
 
 
@@ -51,8 +72,54 @@ class PackageResponse(BaseModel):
     packages: List[Package]
 
 
+# Rewrite one day (or one activity of it) of a package the user already has
+class RegenerateDayRequest(BaseModel):
+    user_id: str
+    package: Package
+    day: int  # DayPlan.day to rewrite
+    activity: Optional[int] = None  # 1-based; only this activity is replaced
+    instruction: Optional[str] = Field(default=None, max_length=300)  # "cheaper", "more museums", ...
+
+    @model_validator(mode="after")
+    def _check_target(self):
+        plan = self.day_plan()
+        if plan is None:
+            raise ValueError(f"Package has no day {self.day}")
+        if self.activity is not None and not 1 <= self.activity <= len(plan.activities):
+            raise ValueError(f"Day {self.day} has no activity {self.activity}")
+        return self
+
+    def day_plan(self) -> Optional[DayPlan]:
+        return next((plan for plan in self.package.days if plan.day == self.day), None)
+
+
 class SaveItineraryRequest(BaseModel):
     user_id: str
     selected_package: Package
 
 
+class SaveItinerariesRequest(BaseModel):
+    user_id: str
+    packages: List[Package]
+
+
+# Background generation jobs (/suggest-packages/*/jobs)
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str  # prompt / filters
+    status: str  # queued / running / succeeded / failed / cancelled
+    priority: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[PackageResponse] = None
+    error: Optional[str] = None
+
+
+# One line of /suggest-packages/filters/bulk output; index is the item's
+# position in the submitted batch.
+class BulkFilterResult(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[PackageResponse] = None
+    error: Optional[str] = None
@@ -14,4 +14,31 @@ class UserProfile(BaseModel):
     visa_expiry: Optional[date] = None
     travel_persona: Optional[str] = "flexible"
     interests: Optional[List[str]] = []
-    preferred_languages: Optional[List[str]] = []
\ No newline at end of file
+    preferred_languages: Optional[List[str]] = []
+
+
+# A profile without passport or visa details, as GET /users lists them
+class UserListing(BaseModel):
+    user_id: str
+    name: str
+    email: str
+    nationality: str
+    country_of_residence: Optional[str] = None
+    travel_persona: Optional[str] = "flexible"
+    interests: Optional[List[str]] = []
+    preferred_languages: Optional[List[str]] = []
+
+
+# GET /users: a page of listings (or the ones asked for by id)
+class UserProfilePage(BaseModel):
+    items: List[UserListing]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+
+# What authenticated endpoints get from get_current_user: the identity
+# fields only, cheap to cache or to carry as signed token claims.
+class Principal(BaseModel):
+    user_id: str
+    email: str
+    name: Optional[str] = None
+    nationality: Optional[str] = None
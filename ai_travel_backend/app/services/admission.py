@@ -0,0 +1,235 @@
+# Admission control for the generation endpoints. Each call holds an LLM
+# slot for tens of seconds, so without this one user (or script) firing
+# dozens of requests at once starves everyone else.
+#
+# - a token bucket per user limits how often a user may start a generation;
+# - at most max_active generations run at once on this worker (sized to the
+#   OpenAI RPM/TPM quota), and a user may have at most user_max_pending
+#   running or queued;
+# - the rest wait in a queue served round-robin across users, so a user
+#   with many queued requests doesn't delay one with a single request;
+# - anything over those limits, or queued longer than max_wait, is
+#   rejected straight away with AdmissionRejected (429 at the API).
+#
+# Callers are identified by a key from app.dependencies.admission: the
+# authenticated principal when there is one, otherwise the client address
+# (never the user_id in the request body, which anyone can rotate).
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+admission_requests = registry.register(Counter(
+    "admission_requests_total", "Generation requests by admission outcome", ("outcome",)))
+admission_wait_seconds = registry.register(Histogram(
+    "admission_wait_seconds", "Time admitted requests spent queued",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        # 0 when a token was taken, otherwise seconds until one is available.
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Slot:
+    # What acquire() hands out; release() is idempotent, so a stream can
+    # release from both its generator and a finalizer.
+    def __init__(self, controller: Optional["AdmissionController"], user_id: str):
+        self._controller = controller
+        self._user_id = user_id
+
+    def release(self) -> None:
+        controller, self._controller = self._controller, None
+        if controller is not None:
+            controller._release(self._user_id)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_active: int,
+        max_queued: int,
+        max_wait: float,
+        user_rate_per_minute: float,
+        user_burst: int,
+        user_max_pending: int,
+        max_tracked_users: int = 10_000,
+        enabled: bool = True,
+    ):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.user_rate = user_rate_per_minute / 60
+        self.user_burst = user_burst
+        self.user_max_pending = user_max_pending
+        self.max_tracked_users = max_tracked_users
+        self.enabled = enabled
+        self._active = 0
+        self._queued = 0
+        self._pending: Dict[str, int] = {}  # running + queued, per user
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()  # round-robin order
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def active(self) -> int:
+        return self._active
+
+    def queued(self) -> int:
+        return self._queued
+
+    def queued_users(self) -> int:
+        return len(self._queues)
+
+    def charge(self, user_id: str) -> None:
+        # Rate limit only: for work that queues elsewhere (background jobs).
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        wait = self._bucket(user_id, now).take(now)
+        if wait:
+            self._reject("user_rate", wait)
+
+    async def acquire(self, user_id: str, batch: bool = False) -> Slot:
+        # batch: an item of a bulk request. The batch was charged once up
+        # front and bounds its own concurrency, so only the global cap and
+        # the fair queue apply, and the item waits as long as it takes.
+        if not self.enabled:
+            return Slot(None, user_id)
+        if not batch:
+            if self._pending.get(user_id, 0) >= self.user_max_pending:
+                self._reject("user_pending", 1.0)
+            self.charge(user_id)
+
+        if self._active < self.max_active and not self._queued:
+            self._active += 1
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+            admission_requests.inc(outcome="admitted")
+            admission_wait_seconds.observe(0)
+            return Slot(self, user_id)
+
+        if self._queued >= self.max_queued:
+            self._reject("queue_full", self.max_wait)
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_id, deque()).append(future)
+        self._queued += 1
+        self._pending[user_id] = self._pending.get(user_id, 0) + 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, None if batch else self.max_wait)
+        except asyncio.TimeoutError:
+            # Granted in the same loop iteration as the timeout: the slot
+            # is ours and has to be given back.
+            if future.done() and not future.cancelled():
+                self._release(user_id)
+            else:
+                self._leave_queue(user_id, future)
+            self._reject("wait_timeout", self.max_wait)
+        except asyncio.CancelledError:
+            # The client went away: give the slot back if it was granted.
+            if future.cancelled():
+                self._leave_queue(user_id, future)
+            else:
+                self._release(user_id)
+            raise
+        admission_requests.inc(outcome="queued")
+        admission_wait_seconds.observe(time.monotonic() - started)
+        return Slot(self, user_id)
+
+    def _bucket(self, user_id: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.user_rate, self.user_burst, now)
+            if len(self._buckets) > self.max_tracked_users:
+                self._buckets.popitem(last=False)  # least recently seen user starts over with a full bucket
+        else:
+            self._buckets.move_to_end(user_id)
+        return bucket
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        admission_requests.inc(outcome=reason)
+        logger.info("admission rejected", extra={"reason": reason, "retry_after": round(retry_after, 1)})
+        raise AdmissionRejected(reason, retry_after)
+
+    def _leave_queue(self, user_id: str, future: asyncio.Future) -> None:
+        queue = self._queues.get(user_id)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._queued -= 1
+            if not queue:
+                del self._queues[user_id]
+        self._forget(user_id)
+
+    def _release(self, user_id: str) -> None:
+        self._active -= 1
+        self._forget(user_id)
+        self._dispatch()
+
+    def _forget(self, user_id: str) -> None:
+        pending = self._pending.get(user_id, 0) - 1
+        if pending > 0:
+            self._pending[user_id] = pending
+        else:
+            self._pending.pop(user_id, None)
+
+    def _dispatch(self) -> None:
+        # One request from the user at the head of the rotation, who then
+        # moves to the back if they still have requests waiting.
+        while self._active < self.max_active and self._queues:
+            user_id, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._queued -= 1
+            if queue:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            if future.done():  # timed out or cancelled; its waiter cleans up
+                continue
+            self._active += 1
+            future.set_result(None)
+
+
+admission = AdmissionController(
+    max_active=settings.admission_max_active,
+    max_queued=settings.admission_max_queued,
+    max_wait=settings.admission_max_wait_seconds,
+    user_rate_per_minute=settings.admission_user_rate_per_minute,
+    user_burst=settings.admission_user_burst,
+    user_max_pending=settings.admission_user_max_pending,
+    max_tracked_users=settings.admission_max_tracked_users,
+    enabled=settings.admission_enabled,
+)
+
+registry.register(Gauge(
+    "admission_slots", "Generations running and waiting for admission",
+    lambda: {("active",): admission.active(), ("queued",): admission.queued()}, labelnames=("state",),
+))
+registry.register(Gauge(
+    "admission_queued_users", "Users with at least one request waiting for admission",
+    lambda: {(): admission.queued_users()},
+))
@@ -0,0 +1,192 @@
+import hashlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+from app.models.itinerary import FilterRequest, PackageResponse, PromptRequest, TravelIntent
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def size(self) -> Optional[int]:
+        return None
+
+
+class InMemoryCacheBackend(CacheBackend):
+    # LRU over an OrderedDict; expired entries are dropped when touched.
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def size(self) -> Optional[int]:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    # Shared between workers; eviction is left to Redis' maxmemory-policy.
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("cache_backend=redis requires the 'redis' package") from e
+        self._client = redis_asyncio.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._client.set(key, value, ex=max(1, int(ttl)))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+
+def build_cache_backend(max_entries: Optional[int] = None) -> CacheBackend:
+    if settings.cache_backend == "memory":
+        return InMemoryCacheBackend(max_entries or settings.cache_max_entries)
+    if settings.cache_backend == "redis":
+        if not settings.cache_url:
+            raise RuntimeError("cache_backend=redis requires cache_url")
+        return RedisCacheBackend(settings.cache_url)
+    raise RuntimeError(f"Unknown cache_backend: {settings.cache_backend}")
+
+
+# Canonical request keys
+_SEASONS = {
+    12: "winter", 1: "winter", 2: "winter",
+    3: "spring", 4: "spring", 5: "spring",
+    6: "summer", 7: "summer", 8: "summer",
+    9: "autumn", 10: "autumn", 11: "autumn",
+}
+
+
+def normalize_text(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).casefold()
+
+
+def season_of(day: date) -> str:
+    return _SEASONS[day.month]
+
+
+def prompt_key(request: PromptRequest) -> str:
+    return f"prompt:v1:{normalize_text(request.prompt)}"
+
+
+def intent_cache_key(prompt: str) -> str:
+    # Prompts can be long; the key only needs to identify the text.
+    return "intent:v1:" + hashlib.sha256(normalize_text(prompt).encode()).hexdigest()
+
+
+def intent_packages_key(intent: TravelIntent, days: int) -> str:
+    # Prompts worded differently but asking for the same trip share plans.
+    return "intent-packages:v1:" + "|".join([
+        normalize_text(intent.destination),
+        str(days),
+        normalize_text(intent.preferred_month),
+        normalize_text(intent.mood),
+        ",".join(sorted(normalize_text(i) for i in intent.interests)),
+        normalize_text(intent.travel_type),
+        normalize_text(intent.budget),
+    ])
+
+
+def filters_cache_key(request: FilterRequest) -> str:
+    duration = (request.to_date - request.from_date).days + 1
+    return "filters:v1:" + "|".join([
+        normalize_text(request.destination),
+        str(duration),
+        season_of(request.from_date),
+        normalize_text(request.budget),
+        normalize_text(request.travel_type),
+    ])
+
+
+class ResponseCache:
+    # Caches pydantic documents (PackageResponse unless told otherwise).
+    def __init__(self, backend: CacheBackend, ttl: float, model: Type[BaseModel] = PackageResponse):
+        self.backend = backend
+        self.ttl = ttl
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[BaseModel]:
+        try:
+            raw = await self.backend.get(key)
+        except Exception as e:
+            logger.warning("cache get failed", extra={"key": key, "error": str(e)})
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        try:
+            value = self.model.model_validate_json(raw)
+        except ValidationError as e:
+            # Written by an older schema (or corrupted): drop it and regenerate.
+            logger.warning("cache entry invalid, dropped", extra={"key": key, "error": str(e)})
+            await self._delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, response: BaseModel) -> None:
+        try:
+            await self.backend.set(key, response.model_dump_json(), self.ttl)
+        except Exception as e:
+            logger.warning("cache set failed", extra={"key": key, "error": str(e)})
+
+    async def _delete(self, key: str) -> None:
+        try:
+            await self.backend.delete(key)
+        except Exception as e:
+            logger.warning("cache delete failed", extra={"key": key, "error": str(e)})
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": await self.backend.size(),
+        }
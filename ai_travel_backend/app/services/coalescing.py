@@ -0,0 +1,61 @@
+# Single-flight: concurrent callers with the same key share one in-flight
+# call instead of each starting their own.
+#
+# The call runs as its own task, so a leader whose client disconnects
+# doesn't fail everyone else waiting on it; it is only cancelled once
+# every waiter has gone away.
+
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from app.core.metrics import Counter, registry
+
+T = TypeVar("T")
+
+coalesced_requests = registry.register(Counter(
+    "singleflight_requests_total", "Calls through a single-flight group by role", ("flight", "role")))
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        # Returns fn()'s result; the first caller for a key runs it
+        # ("leader"), later callers arriving before it finishes wait for
+        # the same result ("follower"). Callers get the same object, so
+        # copy it before mutating.
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            coalesced_requests.inc(flight=self.name, role="leader")
+        else:
+            coalesced_requests.inc(flight=self.name, role="follower")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if not call.task.done() and call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            call.task.exception()  # mark retrieved; waiters already saw it
+
@@ -0,0 +1,214 @@
+# Local destination knowledge base (app/data/destinations.json): monthly
+# weather, typical cost bands, local transport and short-stay visa rules.
+#
+# Filter requests for a known destination hand the model these facts
+# instead of asking it to work them out, and local_transport and
+# visa_required are filled in from here rather than generated at all.
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.itinerary import Package
+from app.services.cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "destinations.json"
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+# Checked in this order, on whole words: "mid-range budget" and "medium
+# budget" are mid, not budget.
+_BUDGET_BANDS = (
+    ("mid", ("mid", "medium", "midrange", "moderate", "average", "standard")),
+    ("budget", ("low", "budget", "cheap", "economy", "backpack", "backpacking", "backpacker")),
+    ("luxury", ("high", "luxury", "premium", "lavish", "upscale")),
+)
+_NEGATIONS = frozenset(("not", "no", "non"))
+_WORD = re.compile(r"[a-z]+")
+# "$2000", "2,500 usd", "€1.5k", "300 per day"
+# The currency or "k" has to be next to the number: in "2 adults, $3000
+# total" the budget is 3000, not 2.
+_AMOUNT = re.compile(
+    r"(?P<before>[$€£]\s*)?(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<thousands>k\b)?"
+    r"\s*(?P<after>[$€£]|(?:usd|eur|gbp|dollars?|euros?|pounds?)\b)?",
+    re.IGNORECASE,
+)
+_PER_DAY = re.compile(r"(?:per|a|/)\s*(?:day|night)|\b(?:daily|nightly)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Destination:
+    name: str
+    country: str
+    climate: Tuple[str, ...]  # one entry per month, January first
+    transport: Tuple[str, ...]
+    costs: Dict[str, Dict[str, str]]  # band -> {"hotel_per_night", "daily"}
+
+    def weather(self, start: date, end: date) -> str:
+        months = []
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month) and len(months) < 12:
+            months.append(month)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return "; ".join(f"{_MONTHS[m - 1]}: {self.climate[m - 1]}" for m in months)
+
+    def band(self, budget: Optional[str], days: Optional[int] = None) -> Optional[str]:
+        # None when the budget names neither a band nor an amount we can
+        # turn into a per-day figure.
+        amount = budget_per_day(budget, days)
+        return self._band_for(amount) if amount is not None else budget_band(budget)
+
+    def cost_band(self, budget: str, days: Optional[int] = None) -> Optional[Dict[str, str]]:
+        band = self.band(budget, days)
+        return self.costs.get(band) if band else None
+
+    def _band_for(self, per_day: float) -> str:
+        # The dearest band whose cheapest hotel night plus day's spending
+        # still fits.
+        chosen = "budget"
+        for band in ("mid", "luxury"):
+            costs = self.costs.get(band)
+            if costs and per_day >= _low(costs["hotel_per_night"]) + _low(costs["daily"]):
+                chosen = band
+        return chosen
+
+
+def _low(value: str) -> float:
+    # "$80-120" -> 80, "$450+" -> 450
+    match = re.search(r"\d[\d,]*(?:\.\d+)?", value)
+    return float(match.group().replace(",", "")) if match else 0.0
+
+
+def budget_band(budget: Optional[str]) -> Optional[str]:
+    # The band a budget names in words, or None ("not too high", "flexible").
+    words = _WORD.findall(normalize_text(budget))
+    for band, names in _BUDGET_BANDS:
+        for i, word in enumerate(words):
+            if word in names and not _NEGATIONS.intersection(words[max(i - 2, 0):i]):
+                return band
+    return None
+
+
+def budget_per_day(budget: Optional[str], days: Optional[int] = None) -> Optional[float]:
+    # Per-person spend per day from an amount in the budget: as written for
+    # "$150 a day", otherwise the total spread over the trip. None without
+    # an amount, or for a total when the trip length isn't known.
+    # A bare number counts only from 100 up, and only when no number in the
+    # text carries a currency.
+    text = budget or ""
+    matches = list(_AMOUNT.finditer(text))
+    match = next((m for m in matches if m["before"] or m["thousands"] or m["after"]), None)
+    if match is None:
+        match = next((m for m in matches if _number(m) >= 100), None)
+    if match is None:
+        return None
+    amount = _number(match) * (1000 if match["thousands"] else 1)
+    if _PER_DAY.search(text):
+        return amount
+    return amount / days if days else None
+
+
+def _number(match: "re.Match[str]") -> float:
+    return float(match["number"].replace(",", ""))
+
+
+class DestinationIndex:
+    def __init__(self, data: dict):
+        groups = {name: frozenset(members) for name, members in data.get("nationality_groups", {}).items()}
+        self._aliases: Dict[str, str] = data.get("nationality_aliases", {})
+        self._visa_free: Dict[str, FrozenSet[str]] = {
+            country: frozenset(self._expand(entries, groups)) for country, entries in data.get("visa_free", {}).items()
+        }
+        self._countries = frozenset(self._visa_free) | frozenset(self._aliases.values())
+        for members in groups.values():
+            self._countries |= members
+
+        self._destinations: Dict[str, Destination] = {}
+        for entry in data.get("destinations", []):
+            destination = Destination(
+                name=entry["name"],
+                country=entry["country"],
+                climate=tuple(entry["climate"]),
+                transport=tuple(entry["transport"]),
+                costs=entry["costs"],
+            )
+            for name in [entry["name"], *entry.get("aliases", [])]:
+                self._destinations[normalize_text(name)] = destination
+
+    @staticmethod
+    def _expand(entries: List[str], groups: Dict[str, FrozenSet[str]]) -> List[str]:
+        countries = []
+        for entry in entries:
+            countries.extend(groups[entry[1:]] if entry.startswith("@") else [entry])
+        return countries
+
+    def __len__(self) -> int:
+        return len({d.name for d in self._destinations.values()})
+
+    def find(self, name: str) -> Optional[Destination]:
+        key = normalize_text(name)
+        # "Paris, France" and "Paris" both resolve
+        return self._destinations.get(key) or self._destinations.get(key.split(",")[0].strip())
+
+    def country_of(self, nationality: Optional[str]) -> Optional[str]:
+        key = normalize_text(nationality)
+        country = self._aliases.get(key, key)
+        return country if country in self._countries else None
+
+    def visa_required(self, destination: Destination, nationality: Optional[str]) -> Optional[bool]:
+        # None when the traveller's nationality or the destination's rules
+        # aren't known.
+        country = self.country_of(nationality)
+        if country is None or destination.country not in self._visa_free:
+            return None
+        if country == destination.country:
+            return False
+        return country not in self._visa_free[destination.country]
+
+
+@lru_cache(maxsize=1)
+def destination_index() -> DestinationIndex:
+    path = Path(settings.destination_kb_path) if settings.destination_kb_path else DEFAULT_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = DestinationIndex(json.load(f))
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("destination knowledge base unavailable", extra={"path": str(path), "error": str(e)})
+        return DestinationIndex({})
+    logger.info("destination knowledge base loaded", extra={"path": str(path), "destinations": len(index)})
+    return index
+
+
+def find_destination(name: str) -> Optional[Destination]:
+    if not settings.destination_kb_enabled:
+        return None
+    return destination_index().find(name)
+
+
+# Package fields filled in from here, so the model isn't asked for them.
+# The model never knew the traveller's nationality anyway, so an unknown
+# visa answer stays None rather than a guess.
+KNOWN_FIELDS = ("local_transport", "visa_required")
+
+
+@dataclass(frozen=True)
+class KnownFacts:
+    # What the knowledge base answers for one request.
+    destination: Destination
+    visa_required: Optional[bool]
+
+    def apply(self, package: Package) -> Package:
+        package.local_transport = list(self.destination.transport)
+        package.visa_required = self.visa_required
+        return package
+
+
+def known_facts(destination: Destination, nationality: Optional[str]) -> KnownFacts:
+    return KnownFacts(destination, destination_index().visa_required(destination, nationality))
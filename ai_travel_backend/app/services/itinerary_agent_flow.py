@@ -1,45 +1,78 @@
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
-from dotenv import load_dotenv
-import os
-import json
-
-# Load .env if not already done globally
-load_dotenv()
-
-# Initialize the GPT model
-llm = ChatOpenAI(model="gpt-4", temperature=0.3)
-
-def analyze_user_intent(prompt: str) -> dict:
-    system_prompt = """
-You are an AI travel planner assistant. Your job is to extract the user's travel intent from their free-form prompt. 
-Return a JSON object with the following keys:
-
-- mood: (e.g., adventurous, relaxing, romantic)
-- interests: (list of categories like beach, hiking, nightlife, food, history, etc.)
-- travel_type: (e.g., solo, couple, family, group)
-- duration_days: number of days (if mentioned)
-- preferred_month: (if any mentioned)
-
-If any field is not mentioned, try to infer it or leave it null.
-Your response must be valid JSON and nothing else.
-"""
-
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=prompt)
-    ]
-
-    response = llm(messages)
-    
+# First stage of /suggest-packages/prompt: a small, fast model turns the
+# free-text prompt into a TravelIntent, which is cached by normalised
+# prompt. The expensive generation call then gets a compact brief built
+# from the intent instead of the raw prompt.
+
+import logging
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from app.core.config import settings
+from app.core.metrics import Gauge, registry, span
+from app.models.itinerary import TravelIntent
+from app.services.cache import ResponseCache, build_cache_backend, intent_cache_key
+from app.services.llm import ainvoke_chat
+from app.services.prompts import OutputBudget, record_prompt
+from app.services.response_parser import parse_model
+
+logger = logging.getLogger(__name__)
+
+intent_cache = ResponseCache(
+    build_cache_backend(max_entries=settings.intent_cache_max_entries),
+    ttl=settings.intent_cache_ttl_seconds,
+    model=TravelIntent,
+)
+registry.register(Gauge(
+    "intent_cache_lookups_total", "Travel intent cache lookups",
+    lambda: {("hit",): intent_cache.hits, ("miss",): intent_cache.misses},
+    labelnames=("result",), kind="counter",
+))
+
+INTENT_PROMPT = """Extract the travel intent from the user's request. Reply with minified JSON only:
+{"destination":str|null,"mood":str|null,"interests":[str],"travel_type":str|null,"duration_days":int|null,"preferred_month":str|null,"budget":str|null}
+mood is e.g. adventurous, relaxing, romantic; interests are short categories (beach, hiking, food, history, nightlife, ...);
+travel_type is solo, couple, family or group. Use null for anything not stated or clearly implied."""
+
+INTENT_BUDGET = OutputBudget(max_tokens=120, activities_per_day=0)
+
+
+def _intent_messages(prompt: str) -> List[BaseMessage]:
+    return [SystemMessage(content=INTENT_PROMPT), HumanMessage(content=prompt)]
+
+
+async def analyze_user_intent(prompt: str) -> Optional[TravelIntent]:
+    # None when the model's reply can't be parsed; callers then fall back
+    # to generating from the raw prompt.
+    key = intent_cache_key(prompt)
+    cached = await intent_cache.get(key)
+    if cached is not None:
+        return cached
+
+    messages = _intent_messages(prompt)
+    record_prompt("intent", messages)
+    response = await ainvoke_chat(messages, task="intent", temperature=0, **INTENT_BUDGET.llm_options())
     try:
-        return json.loads(response.content)
-    except Exception as e:
-        print("Parsing Error:", e)
-        return {
-            "mood": None,
-            "interests": [],
-            "travel_type": None,
-            "duration_days": None,
-            "preferred_month": None,
-        }
+        with span("intent.parse"):
+            intent = parse_model(response.content, TravelIntent)
+    except ValueError as e:
+        logger.warning("intent parsing failed", extra={"error": str(e)})
+        return None
+
+    await intent_cache.set(key, intent)
+    return intent
+
+
+def intent_brief(intent: TravelIntent, days: int) -> str:
+    lines = [f"- Destination: {intent.destination or 'suggest destinations that fit'}", f"- Duration: {days} days"]
+    if intent.preferred_month:
+        lines.append(f"- Month: {intent.preferred_month}")
+    if intent.mood:
+        lines.append(f"- Mood: {intent.mood}")
+    if intent.interests:
+        lines.append(f"- Interests: {', '.join(intent.interests)}")
+    if intent.travel_type:
+        lines.append(f"- Travel Type: {intent.travel_type}")
+    if intent.budget:
+        lines.append(f"- Budget: {intent.budget}")
+    return "\n".join(lines)
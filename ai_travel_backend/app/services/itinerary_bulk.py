@@ -0,0 +1,58 @@
+# Bulk generation for partner integrations (nightly catalogue refreshes):
+# many FilterRequests in one call, at most `concurrency` generating at
+# once, identical items generated once. Each running item also holds an
+# admission slot under the caller's key, so a batch counts against the
+# global cap and shares it fairly with interactive users. Results come
+# back in completion order, not submission order, and a failed item never
+# fails the batch.
+
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.metrics import Counter, registry
+from app.models.itinerary import FilterRequest, PackageResponse
+from app.services.admission import admission
+from app.services.itinerary_service import generate_packages_from_filters
+
+bulk_items = registry.register(Counter(
+    "itinerary_bulk_items_total", "Bulk generation items by outcome", ("status",)))
+
+BulkOutcome = Tuple[List[int], Optional[PackageResponse], Optional[BaseException]]
+
+
+async def generate_bulk(
+    items: List[Tuple[int, FilterRequest]], concurrency: int, caller: str
+) -> AsyncIterator[BulkOutcome]:
+    # Yields (indices, response, error) as each distinct request finishes;
+    # indices lists every item that asked for it.
+    indices: Dict[str, List[int]] = {}
+    unique: Dict[str, FilterRequest] = {}
+    for index, request in items:
+        key = request.model_dump_json()
+        indices.setdefault(key, []).append(index)
+        unique.setdefault(key, request)
+    bulk_items.inc(len(items) - len(unique), status="duplicate")
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(request: FilterRequest) -> PackageResponse:
+        async with slots:
+            slot = await admission.acquire(caller, batch=True)
+            try:
+                return await generate_packages_from_filters(request)
+            finally:
+                slot.release()
+
+    tasks = {asyncio.ensure_future(run(request)): key for key, request in unique.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                bulk_items.inc(status="error" if error else "ok")
+                yield indices[tasks[task]], None if error else task.result(), error
+    finally:
+        # The client went away (or the caller stopped reading).
+        for task in pending:
+            task.cancel()
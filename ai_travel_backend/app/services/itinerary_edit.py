@@ -0,0 +1,66 @@
+# Follow-up edits to a package the user already has ("make day 3
+# cheaper", "swap the second activity"). Only the targeted DayPlan (or
+# Activity) is sent to the model and rewritten; it is spliced back into
+# a copy of the package, so an edit costs a few hundred tokens instead of
+# a full regeneration.
+
+import logging
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from app.core.metrics import span
+from app.models.itinerary import Activity, DayPlan, Package, RegenerateDayRequest
+from app.services.llm import ainvoke_chat
+from app.services.prompts import activity_budget, activity_prompt, day_budget, day_prompt, record_prompt
+from app.services.response_parser import parse_model
+
+logger = logging.getLogger(__name__)
+
+
+def _other_days(package: Package, day: int) -> str:
+    return "; ".join(
+        f"day {plan.day}: " + ", ".join(activity.place for activity in plan.activities)
+        for plan in package.days if plan.day != day
+    )
+
+
+async def regenerate_day(request: RegenerateDayRequest) -> Package:
+    # Raises ResponseParseError when the model's reply isn't a valid day
+    # or activity; the package passed in is never modified.
+    plan = request.day_plan()
+    if request.activity is None:
+        updated = await _rewrite_day(request, plan)
+    else:
+        updated = await _replace_activity(request, plan)
+
+    package = request.package.model_copy(deep=True)
+    package.days = [updated if existing.day == plan.day else existing for existing in package.days]
+    return Package.model_validate(package.model_dump())
+
+
+async def _rewrite_day(request: RegenerateDayRequest, plan: DayPlan) -> DayPlan:
+    budget = day_budget(max(len(plan.activities), 3))
+    prompt = day_prompt(
+        request.package.title, plan.model_dump_json(), _other_days(request.package, plan.day),
+        request.instruction, budget,
+    )
+    rewritten = await _complete(prompt, "day", budget.llm_options(), DayPlan)
+    # The slot in the trip doesn't move, whatever the model answered.
+    return rewritten.model_copy(update={"day": plan.day, "date": plan.date})
+
+
+async def _replace_activity(request: RegenerateDayRequest, plan: DayPlan) -> DayPlan:
+    prompt = activity_prompt(request.package.title, plan.model_dump_json(), request.activity, request.instruction)
+    activity = await _complete(prompt, "activity", activity_budget().llm_options(), Activity)
+    activities = list(plan.activities)
+    activities[request.activity - 1] = activity
+    return plan.model_copy(update={"activities": activities})
+
+
+async def _complete(prompt: str, task: str, options: dict, model: type):
+    messages: List[BaseMessage] = [HumanMessage(content=prompt)]
+    record_prompt(task, messages)
+    response = await ainvoke_chat(messages, task=task, days=1, **options)
+    with span(f"{task}.parse"):
+        return parse_model(response.content, model)
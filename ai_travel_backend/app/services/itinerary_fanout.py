@@ -0,0 +1,85 @@
+# Fan-out generation: one short planner call picks the three package
+# themes, then each package is written by its own concurrent call, so
+# wall-clock latency follows the longest single package instead of all three.
+# A planner reply that doesn't give PACKAGE_COUNT usable plans raises
+# ResponseParseError, and the caller falls back to the single-call path.
+
+import asyncio
+from typing import AsyncIterator, List
+
+from langchain_core.messages import HumanMessage
+from pydantic import TypeAdapter, ValidationError
+
+from app.core.config import settings
+from app.models.itinerary import Package, PackagePlan, PackageResponse
+from app.services.llm import ainvoke_chat
+from app.services.prompts import (
+    PACKAGE_COUNT, PACKAGE_SCHEMA, OutputBudget, output_budget, planner_budget, planner_prompt, record_prompt,
+    single_package_prompt,
+)
+from app.services.response_parser import ResponseParseError, parse_json_object, parse_model
+
+_PLANS = TypeAdapter(List[PackagePlan])
+
+
+async def plan_packages(brief: str) -> List[PackagePlan]:
+    messages = [HumanMessage(content=planner_prompt(brief))]
+    record_prompt("planner", messages)
+    response = await ainvoke_chat(messages, task="planner", **planner_budget().llm_options())
+    parsed = parse_json_object(response.content)
+    try:
+        plans = _PLANS.validate_python(parsed.get("packages") if isinstance(parsed, dict) else parsed)
+    except ValidationError as e:
+        raise ResponseParseError("Planner output is not a list of package plans") from e
+    if len(plans) < PACKAGE_COUNT:
+        raise ResponseParseError(f"Planner returned {len(plans)} of {PACKAGE_COUNT} packages")
+    return plans[:PACKAGE_COUNT]
+
+
+async def _write_package(
+    index: int, brief: str, days_hint: str, days: int, plans: List[PackagePlan], budget: OutputBudget,
+    slots: asyncio.Semaphore, schema: str,
+) -> Package:
+    plan = plans[index]
+    others = plans[:index] + plans[index + 1:]
+    messages = [HumanMessage(content=single_package_prompt(brief, days_hint, plan, others, budget, schema))]
+    record_prompt("package", messages)
+    async with slots:
+        response = await ainvoke_chat(messages, task="package", days=days, **budget.llm_options())
+    package = parse_model(response.content, Package)
+    package.package_id = f"pkg-{index + 1}"
+    return package
+
+
+async def generate_packages_fanout(
+    plans: List[PackagePlan], brief: str, days_hint: str, days: int, schema: str = PACKAGE_SCHEMA
+) -> PackageResponse:
+    budget = output_budget(days, packages=1)
+    slots = asyncio.Semaphore(settings.llm_fanout_concurrency)
+    tasks = [
+        asyncio.ensure_future(_write_package(i, brief, days_hint, days, plans, budget, slots, schema))
+        for i in range(len(plans))
+    ]
+    try:
+        packages = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return PackageResponse(packages=list(packages))
+
+
+async def stream_packages_fanout(
+    plans: List[PackagePlan], brief: str, days_hint: str, days: int, schema: str = PACKAGE_SCHEMA
+) -> AsyncIterator[Package]:
+    budget = output_budget(days, packages=1)
+    slots = asyncio.Semaphore(settings.llm_fanout_concurrency)
+    tasks = [
+        asyncio.ensure_future(_write_package(i, brief, days_hint, days, plans, budget, slots, schema))
+        for i in range(len(plans))
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,163 +1,377 @@
-import os
-import uuid
-from datetime import timedelta, datetime
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+import asyncio
+import logging
+from datetime import timedelta
+from functools import partial
+from typing import AsyncIterator, List, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.core.logging import summarize_payload
+from app.core.metrics import registry, span, Gauge
+from app.db.db import AsyncSessionLocal
+from app.db.models import User
 from app.models.itinerary import (
-    PromptRequest, FilterRequest, PackageResponse
+    PromptRequest, FilterRequest, PackageResponse, Package, PackagePlan, TravelIntent
 )
+from app.models.user import Principal
+from app.services.cache import (
+    ResponseCache, build_cache_backend, filters_cache_key, intent_packages_key, prompt_key,
+)
+from app.services.coalescing import SingleFlight
+from app.services.destination_kb import KNOWN_FIELDS, KnownFacts, find_destination, known_facts
+from app.services.itinerary_agent_flow import analyze_user_intent, intent_brief
+from app.services.itinerary_fanout import generate_packages_fanout, plan_packages, stream_packages_fanout
+from app.services.llm import ainvoke_chat, astream_chat
+from app.services.prompts import (
+    PACKAGE_COUNT, PACKAGE_SCHEMA, OutputBudget, output_budget, package_schema, packages_prompt, record_prompt,
+    trip_days_from_prompt,
+)
+from app.services.similarity_cache import similar_prompts
+from app.services.user_cache import principal_cache
+from app.services.response_parser import ResponseParseError, parse_package_response_with_outcome, repair_json
+from app.services.stream_parser import PackageStreamParser
 
-import json
+logger = logging.getLogger(__name__)
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+response_cache = ResponseCache(build_cache_backend(), ttl=settings.cache_ttl_seconds)
+registry.register(Gauge(
+    "itinerary_cache_lookups_total", "Itinerary response cache lookups",
+    lambda: {("hit",): response_cache.hits, ("miss",): response_cache.misses},
+    labelnames=("result",), kind="counter",
+))
 
-chat = ChatOpenAI(
-    api_key=OPENAI_API_KEY,
-    model="gpt-4",
-    temperature=0.7
-)
+filters_flight = SingleFlight("filters")
+prompt_flight = SingleFlight("prompt")
+registry.register(Gauge(
+    "singleflight_in_flight", "Keys with a generation currently in flight",
+    lambda: {(f.name,): f.in_flight() for f in (filters_flight, prompt_flight)}, labelnames=("flight",),
+))
 
 
-def generate_packages_from_prompt(request: PromptRequest) -> PackageResponse:
-    system_prompt = f"""
-    Act as a professional travel assistant. Based on this user prompt:
-    "{request.prompt}", suggest 3 unique travel packages. 
-    Each package should include:
-    - Title
-    - Day-wise breakdown with time, place, activity, cost
-    - Accommodation info
-    - Total cost estimate
-    - Whether visa is required
-    - Notes
-
-    Format the response as JSON:
-    {{
-      "packages": [
-        {{
-          "package_id": "string",
-          "title": "string",
-          "days": [
-            {{
-              "day": 1,
-              "date": "2025-06-15",
-              "activities": [
-                {{
-                  "time": "09:00 AM",
-                  "place": "string",
-                  "activity": "string",
-                  "cost": "$20"
-                }}
-              ]
-            }}
-          ],
-          "total_cost_estimate": "$500",
-          "accommodation": {{
-            "name": "Hotel Name",
-            "cost_per_night": "$120",
-            "amenities": ["WiFi", "Breakfast"]
-          }},
-          "local_transport": ["Uber", "Metro"],
-          "visa_required": false,
-          "notes": "Some helpful tips"
-        }}
-      ]
-    }}
-    """
-
-    response = chat.invoke([HumanMessage(content=system_prompt)])
-
-    print("\n🔍 GPT Raw Response (Prompt):\n", response.content)
+def _prompt_brief(request: PromptRequest) -> str:
+    return f'User request: "{request.prompt}"'
 
-    try:
-        parsed = json.loads(response.content)
-    except json.JSONDecodeError as e:
-        print("⚠️ JSON decode error:", e)
-        try:
-            parsed = eval(response.content)
-        except Exception as inner:
-            print("❌ Eval failed:", inner)
-            raise inner
 
-    return PackageResponse(**parsed)
+def _filter_days(request: FilterRequest) -> int:
+    return (request.to_date - request.from_date).days + 1
 
 
-def generate_packages_from_filters(request: FilterRequest) -> PackageResponse:
-    duration = (request.to_date - request.from_date).days + 1
-
-    system_prompt = f"""
-Act as a travel assistant. Suggest 3 complete travel packages for:
-- Destination: {request.destination}
+def _filter_brief(request: FilterRequest, facts: Optional[KnownFacts] = None) -> str:
+    duration = _filter_days(request)
+    if facts is None:
+        return f"""- Destination: {request.destination}
 - Duration: {duration} days (from {request.from_date} to {request.to_date})
 - Budget: {request.budget}
 - Travel Type: {request.travel_type}
+Assume the typical seasonal weather in {request.destination} during this period and
+avoid long outdoor daytime activities if it is hot or rainy."""
+
+    destination = facts.destination
+    costs = destination.cost_band(request.budget, duration)
+    # Only quote local prices when we know which band the traveller meant.
+    typical = ""
+    if costs:
+        typical = f' (typical there: hotels {costs["hotel_per_night"]}/night, {costs["daily"]}/day per person)'
+    return f"""- Destination: {destination.name}
+- Duration: {duration} days (from {request.from_date} to {request.to_date})
+- Budget: {request.budget}{typical}
+- Travel Type: {request.travel_type}
+- Weather: {destination.weather(request.from_date, request.to_date)}
+Avoid long outdoor daytime activities if it is hot or rainy."""
+
+
+def _filter_days_hint(request: FilterRequest) -> str:
+    duration = _filter_days(request)
+    return f"each of the {duration} days, starting {request.from_date}"
+
+
+PROMPT_DAYS_HINT = "each day of the trip the user asked for"
+MAX_INTENT_DAYS = 30
+
+
+def _prompt_days(request: PromptRequest) -> int:
+    return trip_days_from_prompt(request.prompt) or settings.llm_default_trip_days
+
+
+def _prompt_days_hint(request: PromptRequest) -> str:
+    days = trip_days_from_prompt(request.prompt)
+    return f"each of the {days} days" if days else PROMPT_DAYS_HINT
+
+
+def _intent_days(intent: TravelIntent, request: PromptRequest) -> int:
+    days = intent.duration_days or _prompt_days(request)
+    return min(max(days, 1), MAX_INTENT_DAYS)
+
+
+async def _prompt_intent(request: PromptRequest) -> Optional[TravelIntent]:
+    # The intent stage; None means generate from the raw prompt instead.
+    if not settings.intent_pipeline_enabled:
+        return None
+    intent = await analyze_user_intent(request.prompt)
+    return intent if intent is not None and intent.is_usable() else None
+
+
+async def generate_packages_from_prompt(request: PromptRequest) -> PackageResponse:
+    intent = await _prompt_intent(request)
+    if intent is not None:
+        return await _generate_from_intent(intent, _intent_days(intent, request), request.prompt)
+
+    generate = partial(_generate, _prompt_brief(request), _prompt_days_hint(request), _prompt_days(request), "prompt")
+    if not settings.coalesce_enabled:
+        return await generate()
+    response = await prompt_flight.do(prompt_key(request), generate)
+    return response.model_copy(deep=True)
+
+
+async def _generate_from_intent(intent: TravelIntent, days: int, prompt: str) -> PackageResponse:
+    # Prompts that reduce to the same intent share cached plans and
+    # in-flight generations; near-identical prompts for the same trip
+    # reuse an earlier generation.
+    key = intent_packages_key(intent, days)
+    if settings.cache_enabled:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return cached
+    if settings.similarity_cache_enabled:
+        similar = similar_prompts.get(prompt, intent, days)
+        if similar is not None:
+            return similar.model_copy(deep=True)
+
+    generate = partial(_generate_and_cache, key, intent_brief(intent, days), f"each of the {days} days", days, "intent")
+    if settings.coalesce_enabled:
+        response, complete = await prompt_flight.do(key, generate)
+    else:
+        response, complete = await generate()
+    if settings.similarity_cache_enabled and complete:
+        similar_prompts.set(prompt, intent, days, response)
+    return response.model_copy(deep=True)
+
+
+async def generate_packages_from_filters(request: FilterRequest) -> PackageResponse:
+    facts = await _known_facts(request)
+    key = _filters_key(request, facts)
+    if settings.cache_enabled:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return _personalize(cached, request, facts)
+
+    generate = partial(
+        _generate_and_cache, key, _filter_brief(request, facts), _filter_days_hint(request), _filter_days(request),
+        "filters", schema=_filter_schema(facts),
+    )
+    if not settings.coalesce_enabled:
+        response, _ = await generate()
+        return _personalize(response, request, facts)
+    # Identical requests arriving while this one is generating share it;
+    # each caller gets its own copy since it is personalised in place.
+    response, _ = await filters_flight.do(key, generate)
+    return _personalize(response.model_copy(deep=True), request, facts)
+
+
+async def _known_facts(request: FilterRequest) -> Optional[KnownFacts]:
+    destination = find_destination(request.destination)
+    if destination is None:
+        return None
+    return known_facts(destination, await _traveller_nationality(request.user_id))
+
 
-Assume the typical seasonal weather in {request.destination} during {request.from_date} to {request.to_date}.
-- If this is a hot or rainy period, avoid long outdoor activities in the day.
-- Recommend indoor, weather-safe, and comfort-focused experiences when applicable.
-- Include time for breaks, flexibility, and convenience.
-
-Strict formatting rules:
-- Return only valid JSON (no markdown, no comments)
-- Each package must include:
-  - package_id, title
-  - day-wise plans for **each of the {duration} days**
-  - total_cost_estimate
-  - accommodation (with cost and amenities)
-  - visa_required (true/false)
-  - local_transport (list)
-  - notes (travel tips, warnings, etc.)
-
-Use this exact format:
-{{
-  "packages": [
-    {{
-      "package_id": "string",
-      "title": "string",
-      "days": [
-        {{
-          "day": 1,
-          "date": "YYYY-MM-DD",
-          "activities": [
-            {{
-              "time": "10:00 AM",
-              "place": "Some Place",
-              "activity": "Some Activity",
-              "cost": "$25"
-            }}
-          ]
-        }}
-      ],
-      "total_cost_estimate": "$700",
-      "accommodation": {{
-        "name": "Hotel Name",
-        "cost_per_night": "$100",
-        "amenities": ["WiFi", "Breakfast"]
-      }},
-      "local_transport": ["Taxi", "Bus"],
-      "visa_required": true,
-      "notes": "Important travel tips"
-    }}
-  ]
-}}
-"""
-
-    response = chat.invoke([HumanMessage(content=system_prompt)])
+async def _traveller_nationality(user_id: str) -> Optional[str]:
+    # From the principal cache; the database only on a miss, and what it
+    # returns goes back in the cache. Filter requests don't otherwise need
+    # a database, so if it is down, slow or not configured the visa answer
+    # is just unknown.
+    principal = await principal_cache.get(user_id)
+    if principal is None:
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await asyncio.wait_for(
+                    db.execute(
+                        select(User.user_id, User.email, User.name, User.nationality).where(User.user_id == user_id)
+                    ),
+                    settings.destination_kb_lookup_timeout_seconds,
+                )
+                row = result.one_or_none()
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError, RuntimeError) as e:
+            logger.warning("nationality lookup failed", extra={"user_id": user_id, "error": str(e)})
+            return None
+        if row is None:
+            return None
+        principal = Principal(**row._mapping)
+        await principal_cache.set(principal)
+    return principal.nationality or None
+
+
+def _filters_key(request: FilterRequest, facts: Optional[KnownFacts]) -> str:
+    if facts is None:
+        return filters_cache_key(request)
+    # Every spelling of a known destination shares plans; they leave out
+    # the fields the knowledge base fills in, so they're kept apart.
+    canonical = request.model_copy(update={"destination": facts.destination.name})
+    return f"{filters_cache_key(canonical)}|kb"
+
+
+def _filter_schema(facts: Optional[KnownFacts]) -> str:
+    return package_schema(omit=KNOWN_FIELDS) if facts is not None else PACKAGE_SCHEMA
+
+
+# Cached plans are shared by every trip with the same duration and season,
+# so day dates are moved onto the caller's own date range, and the
+# traveller-specific facts are filled in per request.
+def _personalize(response: PackageResponse, request: FilterRequest, facts: Optional[KnownFacts]) -> PackageResponse:
+    for package in response.packages:
+        _personalize_package(package, request, facts)
+    return response
+
+
+def _personalize_package(package: Package, request: FilterRequest, facts: Optional[KnownFacts]) -> Package:
+    for day_plan in package.days:
+        day_plan.date = request.from_date + timedelta(days=day_plan.day - 1)
+    if facts is not None:
+        facts.apply(package)
+    return package
+
+
+async def _generate_and_cache(
+    key: str, brief: str, days_hint: str, days: int, source: str, schema: str = PACKAGE_SCHEMA
+) -> Tuple[PackageResponse, bool]:
+    # Returns the response and whether it was complete. A salvaged or
+    # short reply is served but not cached (as with streams), so it isn't
+    # handed out again for the whole TTL.
+    response, outcome = await _generate_with_outcome(brief, days_hint, days, source, schema)
+    complete = outcome != "salvaged" and len(response.packages) == PACKAGE_COUNT
+    if settings.cache_enabled and complete:
+        await response_cache.set(key, response)
+    return response, complete
+
+
+async def _generate(
+    brief: str, days_hint: str, days: int, source: str, schema: str = PACKAGE_SCHEMA
+) -> PackageResponse:
+    response, _ = await _generate_with_outcome(brief, days_hint, days, source, schema)
+    return response
+
+
+async def _generate_with_outcome(
+    brief: str, days_hint: str, days: int, source: str, schema: str = PACKAGE_SCHEMA
+) -> Tuple[PackageResponse, str]:
+    plans = await _fanout_plans(brief)
+    if plans is not None:
+        return await generate_packages_fanout(plans, brief, days_hint, days, schema), "clean"
+
+    budget = output_budget(days)
+    with span("prompt.build"):
+        messages = [HumanMessage(content=packages_prompt(brief, days_hint, budget, schema))]
+        record_prompt("packages", messages)
+    response = await ainvoke_chat(messages, days=days, **budget.llm_options())
     raw_output = response.content.strip()
 
-    print("\n🔍 GPT Raw Response (Filter):\n", raw_output)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("llm response", extra={"source": source, "body": summarize_payload(raw_output)})
 
+    return _parse_response(raw_output)
+
+
+def _parse_response(raw_output: str) -> Tuple[PackageResponse, str]:
+    with span("response.parse"):
+        response, outcome = parse_package_response_with_outcome(raw_output)
+    if outcome == "salvaged":
+        logger.warning(
+            "salvaged packages from malformed llm output",
+            extra={"packages": len(response.packages), "body": summarize_payload(raw_output)},
+        )
+    return response, outcome
+
+
+# Streaming variants: yield each package as soon as it is complete and valid.
+async def stream_packages_from_prompt(request: PromptRequest) -> AsyncIterator[Package]:
+    intent = await _prompt_intent(request)
+    if intent is None:
+        stream = _stream(_prompt_brief(request), _prompt_days_hint(request), _prompt_days(request))
+        async for package in stream:
+            yield package
+        return
+
+    days = _intent_days(intent, request)
+    if settings.similarity_cache_enabled:
+        similar = similar_prompts.get(request.prompt, intent, days)
+        if similar is not None:
+            for package in similar.model_copy(deep=True).packages:
+                yield package
+            return
+
+    key = intent_packages_key(intent, days)
+    packages = []
+    async for package in _stream_cached(key, intent_brief(intent, days), f"each of the {days} days", days):
+        packages.append(package.model_copy(deep=True))
+        yield package
+    if settings.similarity_cache_enabled and len(packages) == PACKAGE_COUNT:
+        similar_prompts.set(request.prompt, intent, days, PackageResponse(packages=packages))
+
+
+async def stream_packages_from_filters(request: FilterRequest) -> AsyncIterator[Package]:
+    facts = await _known_facts(request)
+    stream = _stream_cached(
+        _filters_key(request, facts), _filter_brief(request, facts), _filter_days_hint(request),
+        _filter_days(request), _filter_schema(facts),
+    )
+    async for package in stream:
+        yield _personalize_package(package, request, facts)
+
+
+async def _stream_cached(
+    key: str, brief: str, days_hint: str, days: int, schema: str = PACKAGE_SCHEMA
+) -> AsyncIterator[Package]:
+    if settings.cache_enabled:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            for package in cached.packages:
+                yield package
+            return
+
+    packages = []
+    async for package in _stream(brief, days_hint, days, schema):
+        # Cached before the caller personalises it.
+        packages.append(package.model_copy(deep=True))
+        yield package
+
+    # A stream cut short (timeout, malformed tail) is not cached, so the
+    # next caller gets a fresh attempt at the full set.
+    if settings.cache_enabled and len(packages) == PACKAGE_COUNT:
+        await response_cache.set(key, PackageResponse(packages=packages))
+
+
+async def _fanout_plans(brief: str) -> Optional[List[PackagePlan]]:
+    # None when fan-out is off, or when the planner's reply is unusable and
+    # the packages are generated in one call instead.
+    if not settings.llm_fanout_enabled:
+        return None
     try:
-        parsed = json.loads(raw_output)
-    except json.JSONDecodeError as e:
-        print("⚠️ JSON decode error:", e)
-        try:
-            parsed = eval(raw_output)
-        except Exception as inner:
-            print("❌ Eval failed:", inner)
-            raise inner
+        return await plan_packages(brief)
+    except ResponseParseError as e:
+        logger.warning("planner output unusable, generating packages in one call", extra={"error": str(e)})
+        return None
+
 
-    return PackageResponse(**parsed)
+async def _stream(brief: str, days_hint: str, days: int, schema: str = PACKAGE_SCHEMA) -> AsyncIterator[Package]:
+    plans = await _fanout_plans(brief)
+    if plans is not None:
+        stream = stream_packages_fanout(plans, brief, days_hint, days, schema)
+    else:
+        budget = output_budget(days)
+        messages = [HumanMessage(content=packages_prompt(brief, days_hint, budget, schema))]
+        stream = _stream_packages(messages, days, budget)
+    async for package in stream:
+        yield package
 
 
+async def _stream_packages(messages: List[BaseMessage], days: int, budget: OutputBudget) -> AsyncIterator[Package]:
+    record_prompt("packages", messages)
+    parser = PackageStreamParser(repair=repair_json)
+    async for text in astream_chat(messages, days=days, **budget.llm_options()):
+        for item in parser.feed(text):
+            try:
+                yield Package.model_validate(item)
+            except ValidationError as e:
+                logger.warning("skipping invalid streamed package", extra={"errors": e.error_count()})
@@ -0,0 +1,416 @@
+# Background itinerary generation: submit returns a job ID straight away,
+# workers run generate_packages_* and clients poll (or long-poll) for the
+# result, so no HTTP connection is held open for the whole LLM call.
+#
+# Two brokers: "memory" keeps the queue in this process (single-process
+# deployments and local runs); "database" keeps it in itinerary_jobs, so
+# API processes and separate worker processes (app.workers.itinerary_worker)
+# share one queue.
+
+import asyncio
+import heapq
+import itertools
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, registry, request_id_var
+from app.db import job_store
+from app.db.db import AsyncSessionLocal
+from app.models.itinerary import FilterRequest, JobStatus, PackageResponse, PromptRequest
+from app.services.itinerary_service import generate_packages_from_filters, generate_packages_from_prompt
+
+logger = logging.getLogger(__name__)
+
+jobs_total = registry.register(Counter("itinerary_jobs_total", "Itinerary jobs by final status", ("kind", "status")))
+
+TERMINAL_STATUSES = job_store.TERMINAL_STATUSES
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    payload: dict
+    priority: int = 0
+    status: str = "queued"
+    callback_url: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+
+    def to_status(self) -> JobStatus:
+        return JobStatus(
+            job_id=self.id,
+            kind=self.kind,
+            status=self.status,
+            priority=self.priority,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            result=self.result,
+            error=self.error,
+        )
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobBroker(ABC):
+    @abstractmethod
+    async def submit(self, kind: str, payload: dict, priority: int = 0, callback_url: Optional[str] = None) -> Job:
+        ...
+
+    @abstractmethod
+    async def claim(self, timeout: float) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        # Long-poll: returns as soon as the job is finished, or its current
+        # state once timeout runs out.
+        ...
+
+    @abstractmethod
+    async def finish(self, job: Job, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def requeue(self, job: Job) -> None:
+        ...
+
+    @abstractmethod
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    async def cancel_requested(self, job_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def purge(self, finished_before: datetime) -> int:
+        ...
+
+    async def renew(self, job: Job) -> None:
+        # Extends the lease on a running job; only brokers shared between
+        # processes have one.
+        return None
+
+    def queued(self) -> Optional[int]:
+        # Cheap queue depth for metrics, if the broker knows it locally.
+        return None
+
+
+class MemoryJobBroker(JobBroker):
+    def __init__(self, max_queued: int):
+        self.max_queued = max_queued
+        self._jobs: Dict[str, Job] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._heap: List[tuple] = []  # (-priority, seq, job_id); cancelled entries are skipped on pop
+        self._seq = itertools.count()
+        self._queued = 0
+        self._available = asyncio.Condition()
+
+    async def submit(self, kind: str, payload: dict, priority: int = 0, callback_url: Optional[str] = None) -> Job:
+        if self._queued >= self.max_queued:
+            raise QueueFullError()
+        job = Job(id=uuid.uuid4().hex, kind=kind, payload=payload, priority=priority, callback_url=callback_url)
+        self._jobs[job.id] = job
+        self._done[job.id] = asyncio.Event()
+        await self._push(job)
+        return job
+
+    async def _push(self, job: Job) -> None:
+        async with self._available:
+            heapq.heappush(self._heap, (-job.priority, next(self._seq), job.id))
+            self._queued += 1
+            self._available.notify()
+
+    async def claim(self, timeout: float) -> Optional[Job]:
+        async with self._available:
+            while True:
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is not None and job.status == "queued":
+                        self._queued -= 1
+                        job.status, job.started_at = "running", _now()
+                        return job
+                try:
+                    await asyncio.wait_for(self._available.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        done = self._done.get(job_id)
+        if done is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._jobs.get(job_id)
+
+    async def finish(self, job: Job, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        job.status, job.finished_at, job.result, job.error = status, _now(), result, error
+        self._done[job.id].set()
+
+    async def requeue(self, job: Job) -> None:
+        job.status, job.started_at = "queued", None
+        await self._push(job)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status == "queued":
+            self._queued -= 1  # its heap entry is skipped when popped
+            await self.finish(job, "cancelled")
+        elif job.status == "running":
+            job.cancel_requested = True
+        return job
+
+    async def cancel_requested(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        return job is not None and job.cancel_requested
+
+    async def purge(self, finished_before: datetime) -> int:
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in TERMINAL_STATUSES and job.finished_at < finished_before
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            del self._done[job_id]
+        return len(expired)
+
+    def queued(self) -> Optional[int]:
+        return self._queued
+
+
+class DatabaseJobBroker(JobBroker):
+    # A claimed job carries a lease (claimed_at) that its worker renews
+    # while it runs; claim() puts jobs with an expired lease back on the
+    # queue, so a worker that dies mid-job doesn't leave it running forever.
+    def __init__(self, max_queued: int, poll_interval: float, lease: float):
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._next_reclaim = 0.0
+
+    @staticmethod
+    def _from_row(row) -> Job:
+        return Job(
+            id=row.id, kind=row.kind, payload=row.payload, priority=row.priority, status=row.status,
+            callback_url=row.callback_url, created_at=row.created_at, started_at=row.started_at,
+            finished_at=row.finished_at, result=row.result, error=row.error, cancel_requested=row.cancel_requested,
+        )
+
+    async def submit(self, kind: str, payload: dict, priority: int = 0, callback_url: Optional[str] = None) -> Job:
+        job = Job(id=uuid.uuid4().hex, kind=kind, payload=payload, priority=priority, callback_url=callback_url)
+        async with AsyncSessionLocal() as db:
+            # Approximate bound: concurrent submits can overshoot by a few.
+            if await job_store.count_queued(db) >= self.max_queued:
+                raise QueueFullError()
+            await job_store.insert_job(
+                db, id=job.id, kind=kind, payload=payload, priority=priority, status="queued",
+                cancel_requested=False, callback_url=callback_url, created_at=job.created_at,
+            )
+        return job
+
+    async def claim(self, timeout: float) -> Optional[Job]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if loop.time() >= self._next_reclaim:
+                self._next_reclaim = loop.time() + self.lease / 4
+                async with AsyncSessionLocal() as db:
+                    expired = await job_store.requeue_expired(db, _now() - timedelta(seconds=self.lease))
+                if expired:
+                    logger.warning("requeued jobs with an expired lease", extra={"jobs": expired})
+            async with AsyncSessionLocal() as db:
+                row = await job_store.claim_job(db, _now())
+            if row is not None:
+                return self._from_row(row)
+            if loop.time() >= deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        async with AsyncSessionLocal() as db:
+            row = await job_store.get_job(db, job_id)
+        return self._from_row(row) if row is not None else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job.status in TERMINAL_STATUSES or loop.time() >= deadline:
+                return job
+            await asyncio.sleep(min(self.poll_interval, max(deadline - loop.time(), 0)))
+
+    async def finish(self, job: Job, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        job.status, job.finished_at, job.result, job.error = status, _now(), result, error
+        async with AsyncSessionLocal() as db:
+            await job_store.finish_job(db, job.id, status, job.finished_at, result=result, error=error)
+
+    async def requeue(self, job: Job) -> None:
+        async with AsyncSessionLocal() as db:
+            await job_store.requeue_job(db, job.id)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        async with AsyncSessionLocal() as db:
+            await job_store.cancel_job(db, job_id, _now())
+            row = await job_store.get_job(db, job_id)
+        return self._from_row(row) if row is not None else None
+
+    async def cancel_requested(self, job_id: str) -> bool:
+        async with AsyncSessionLocal() as db:
+            return await job_store.is_cancel_requested(db, job_id)
+
+    async def purge(self, finished_before: datetime) -> int:
+        async with AsyncSessionLocal() as db:
+            return await job_store.purge_jobs(db, finished_before)
+
+    async def renew(self, job: Job) -> None:
+        async with AsyncSessionLocal() as db:
+            await job_store.renew_claim(db, job.id, _now())
+
+
+def build_job_broker() -> JobBroker:
+    if settings.jobs_broker == "database":
+        return DatabaseJobBroker(
+            settings.jobs_max_queued, settings.jobs_poll_interval_seconds, settings.jobs_lease_seconds
+        )
+    return MemoryJobBroker(settings.jobs_max_queued)
+
+
+async def run_job(job: Job) -> PackageResponse:
+    if job.kind == "prompt":
+        return await generate_packages_from_prompt(PromptRequest.model_validate(job.payload))
+    if job.kind == "filters":
+        return await generate_packages_from_filters(FilterRequest.model_validate(job.payload))
+    raise ValueError(f"Unknown job kind: {job.kind}")
+
+
+class JobWorkerPool:
+    def __init__(self, broker: JobBroker, workers: int):
+        self.broker = broker
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._callbacks: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._housekeeping()))
+
+    async def stop(self) -> None:
+        # Running jobs are put back on the queue for the next worker.
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._callbacks is not None:
+            await self._callbacks.aclose()
+            self._callbacks = None
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await self.broker.claim(timeout=settings.jobs_poll_interval_seconds * 10)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job claim failed")
+                await asyncio.sleep(settings.jobs_poll_interval_seconds * 10)
+                continue
+            if job is not None:
+                await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        request_id_var.set(job.id)  # job logs carry the job id
+        generation = asyncio.ensure_future(run_job(job))
+        loop = asyncio.get_running_loop()
+        renewed = loop.time()
+        try:
+            while not generation.done():
+                await asyncio.wait({generation}, timeout=settings.jobs_poll_interval_seconds)
+                if not generation.done() and await self.broker.cancel_requested(job.id):
+                    generation.cancel()
+                    await asyncio.wait({generation})
+                if not generation.done() and loop.time() - renewed >= settings.jobs_lease_seconds / 4:
+                    renewed = loop.time()
+                    try:
+                        await self.broker.renew(job)
+                    except Exception as e:
+                        logger.warning("job lease renewal failed", extra={"error": str(e)})
+        except asyncio.CancelledError:
+            generation.cancel()
+            await asyncio.shield(self.broker.requeue(job))
+            raise
+
+        if generation.cancelled():
+            status, result, error = "cancelled", None, None
+        elif generation.exception() is not None:
+            e = generation.exception()
+            status, result = "failed", None
+            error = "Itinerary generation timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+            logger.warning("job failed", extra={"kind": job.kind, "error": error})
+        else:
+            status, result, error = "succeeded", generation.result().model_dump(mode="json"), None
+
+        await self.broker.finish(job, status, result=result, error=error)
+        jobs_total.inc(kind=job.kind, status=status)
+        if job.callback_url:
+            await self._notify(job)
+
+    async def _notify(self, job: Job) -> None:
+        if self._callbacks is None:
+            self._callbacks = httpx.AsyncClient(timeout=10)
+        try:
+            response = await self._callbacks.post(job.callback_url, content=job.to_status().model_dump_json(),
+                                                  headers={"Content-Type": "application/json"})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning("job callback failed", extra={"url": job.callback_url, "error": str(e)})
+
+    async def _housekeeping(self) -> None:
+        ttl = timedelta(seconds=settings.jobs_result_ttl_seconds)
+        while True:
+            await asyncio.sleep(min(settings.jobs_result_ttl_seconds, 60))
+            try:
+                await self.broker.purge(_now() - ttl)
+            except Exception:
+                logger.exception("job purge failed")
+
+
+job_broker = build_job_broker()
+worker_pool = JobWorkerPool(job_broker, settings.jobs_workers)
+
+registry.register(Gauge(
+    "itinerary_jobs_queued", "Jobs waiting for a worker (memory broker only)",
+    lambda: {(): job_broker.queued()} if job_broker.queued() is not None else {},
+))
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from app.core.config import settings
+from app.core.metrics import Counter, record_token_usage, registry, span
+from app.services.llm_router import router
+
+logger = logging.getLogger(__name__)
+
+llm_truncated = registry.register(Counter(
+    "llm_truncated_total", "Completions cut off by max_tokens", ("mode",)))
+
+# Caps in-flight LLM calls on this worker; extra callers wait here instead
+# of piling onto OpenAI's rate limit.
+_llm_slots = asyncio.Semaphore(settings.llm_max_concurrency)
+
+
+# task/days pick the model tier (see llm_router); the timeout covers
+# every retry, hedge and fallback of the call.
+async def ainvoke_chat(messages: List[BaseMessage], task: str = "packages", days: Optional[int] = None, **kwargs):
+    async with _llm_slots:
+        with span("llm.invoke"):
+            response = await asyncio.wait_for(
+                router.ainvoke(messages, task, days, **kwargs),
+                timeout=settings.llm_timeout_seconds,
+            )
+    record_token_usage(response)
+    if response.response_metadata.get("finish_reason") == "length":
+        _truncated("invoke", kwargs)
+    return response
+
+
+def _truncated(mode: str, kwargs: dict) -> None:
+    llm_truncated.inc(mode=mode)
+    logger.warning("llm completion hit max_tokens", extra={"mode": mode, "max_tokens": kwargs.get("max_tokens")})
+
+
+async def astream_chat(
+    messages: List[BaseMessage], task: str = "packages", days: Optional[int] = None, **kwargs
+) -> AsyncIterator[str]:
+    # Holds the slot for the whole stream; the timeout covers the full
+    # completion, not each chunk.
+    async with _llm_slots:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.llm_timeout_seconds
+        chunks = router.astream(messages, task, days, **kwargs)
+        try:
+            with span("llm.stream"):
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        return
+                    record_token_usage(chunk)
+                    if chunk.response_metadata.get("finish_reason") == "length":
+                        _truncated("stream", kwargs)
+                    if chunk.content:
+                        yield chunk.content
+        finally:
+            await chunks.aclose()
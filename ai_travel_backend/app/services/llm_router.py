@@ -0,0 +1,289 @@
+# Routes LLM calls between a small/fast and a large model tier.
+#
+# Each tier has its own client, base URL and per-attempt timeout. Calls
+# retry transient failures with exponential backoff (tenacity), can be
+# hedged with a second identical request once the first is slower than a
+# threshold, and go through a per-tier circuit breaker. When a tier is
+# open or exhausts its retries the call falls back to the other tier.
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+import httpx
+from langchain_core.messages import BaseMessage
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, registry
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+llm_calls = registry.register(Counter(
+    "llm_calls_total", "LLM call attempts by tier and outcome", ("tier", "outcome")))
+llm_hedges = registry.register(Counter(
+    "llm_hedged_total", "Hedged LLM requests by which request won", ("tier", "winner")))
+llm_fallbacks = registry.register(Counter(
+    "llm_fallbacks_total", "Calls served by a tier other than the routed one", ("from_tier", "to_tier")))
+
+# Tasks that are always cheap enough for the small tier; "packages" and
+# "package" go there only for short trips.
+SMALL_TASKS = {"intent", "planner", "day", "activity"}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    # closed -> open after `threshold` consecutive failures; after
+    # `reset_after` seconds one trial call is let through (half-open) and
+    # its outcome closes or re-opens the circuit.
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        # The call was cancelled before it could prove anything either way.
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+def _retryable(error: BaseException) -> bool:
+    # Timeouts, connection errors, rate limits and 5xx; a 400 or 401 would
+    # fail the same way on every attempt and every tier.
+    import openai  # already loaded by the client that raised
+
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code in (408, 409, 429) or error.status_code >= 500)
+
+
+class ModelTier:
+    def __init__(self, name: str, model: str, base_url: Optional[str], timeout: float):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(settings.llm_circuit_failures, settings.llm_circuit_reset_seconds)
+        self._client: Optional["ChatOpenAI"] = None
+
+    @property
+    def client(self) -> "ChatOpenAI":
+        # Built on first use: importing langchain_openai and setting up the
+        # client's HTTP stack takes about as long as the rest of startup.
+        # One client per tier per process: it owns the HTTP connection pool,
+        # so requests reuse keep-alive connections. Retries are done by the
+        # router, so the client itself doesn't retry.
+        if self._client is None:
+            from langchain_openai import ChatOpenAI
+
+            self._client = ChatOpenAI(
+                api_key=settings.require("openai_api_key"),
+                base_url=self.base_url,
+                model=self.model,
+                temperature=settings.llm_temperature,
+                timeout=self.timeout,
+                max_retries=0,
+                stream_usage=True,
+            )
+        return self._client
+
+
+class ModelRouter:
+    def __init__(self, large: ModelTier, small: Optional[ModelTier] = None):
+        self.tiers: Dict[str, ModelTier] = {"large": large, "small": small or large}
+
+    def route(self, task: str, days: Optional[int] = None) -> List[ModelTier]:
+        # Primary tier first, then the fallback.
+        small, large = self.tiers["small"], self.tiers["large"]
+        use_small = task in SMALL_TASKS or (days is not None and days <= settings.llm_small_max_days)
+        order = [small, large] if use_small else [large, small]
+        return order[:1] if small is large else order
+
+    def preload(self) -> None:
+        # Builds the clients now rather than on the first call.
+        for tier in set(self.tiers.values()):
+            _ = tier.client
+
+    def _retrying(self) -> AsyncRetrying:
+        return AsyncRetrying(
+            stop=stop_after_attempt(settings.llm_max_retries + 1),
+            wait=wait_exponential_jitter(initial=settings.llm_retry_backoff_seconds, max=8),
+            retry=retry_if_exception(_retryable),
+            reraise=True,
+        )
+
+    async def ainvoke(self, messages: List[BaseMessage], task: str, days: Optional[int] = None, **kwargs):
+        tiers = self.route(task, days)
+        last_error: Optional[BaseException] = None
+        for tier in tiers:
+            if not tier.breaker.allow():
+                last_error = CircuitOpenError(f"{tier.name} model circuit is open")
+                continue
+            try:
+                async for attempt in self._retrying():
+                    with attempt:
+                        response = await self._hedged(tier, messages, kwargs)
+            except asyncio.CancelledError:
+                tier.breaker.release()
+                raise
+            except Exception as e:
+                if not _retryable(e):
+                    tier.breaker.record_success()  # the upstream answered; the request was bad
+                    raise
+                tier.breaker.record_failure()
+                last_error = e
+                logger.warning("llm tier failed", extra={"tier": tier.name, "task": task, "error": repr(e)})
+                continue
+            tier.breaker.record_success()
+            if tier is not tiers[0]:
+                llm_fallbacks.inc(from_tier=tiers[0].name, to_tier=tier.name)
+            return response
+        raise last_error
+
+    async def _attempt(self, tier: ModelTier, messages: List[BaseMessage], kwargs: dict):
+        try:
+            response = await asyncio.wait_for(tier.client.ainvoke(messages, **kwargs), timeout=tier.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            llm_calls.inc(tier=tier.name, outcome="error")
+            raise
+        llm_calls.inc(tier=tier.name, outcome="ok")
+        return response
+
+    async def _hedged(self, tier: ModelTier, messages: List[BaseMessage], kwargs: dict):
+        # Sends a duplicate request if the first hasn't answered within
+        # llm_hedge_after_seconds; whichever finishes first wins.
+        hedge_after = settings.llm_hedge_after_seconds
+        if not hedge_after:
+            return await self._attempt(tier, messages, kwargs)
+
+        first = asyncio.ensure_future(self._attempt(tier, messages, kwargs))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return first.result()
+
+            second = asyncio.ensure_future(self._attempt(tier, messages, kwargs))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        llm_hedges.inc(tier=tier.name, winner="primary" if task is first else "hedge")
+                        return task.result()
+            # Both failed: surface the primary's error.
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def astream(
+        self, messages: List[BaseMessage], task: str, days: Optional[int] = None, **kwargs
+    ) -> AsyncIterator:
+        # Retries and fallback only apply until the first chunk arrives;
+        # after that a failure ends the stream.
+        tiers = self.route(task, days)
+        last_error: Optional[BaseException] = None
+        for tier in tiers:
+            if not tier.breaker.allow():
+                last_error = CircuitOpenError(f"{tier.name} model circuit is open")
+                continue
+            try:
+                async for attempt in self._retrying():
+                    with attempt:
+                        chunks, first = await self._open_stream(tier, messages, kwargs)
+            except asyncio.CancelledError:
+                tier.breaker.release()
+                raise
+            except Exception as e:
+                if not _retryable(e):
+                    tier.breaker.record_success()  # the upstream answered; the request was bad
+                    raise
+                tier.breaker.record_failure()
+                last_error = e
+                logger.warning("llm tier failed", extra={"tier": tier.name, "task": task, "error": repr(e)})
+                continue
+
+            tier.breaker.record_success()
+            if tier is not tiers[0]:
+                llm_fallbacks.inc(from_tier=tiers[0].name, to_tier=tier.name)
+            try:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                await chunks.aclose()
+            return
+        raise last_error
+
+    async def _open_stream(self, tier: ModelTier, messages: List[BaseMessage], kwargs: dict):
+        chunks = tier.client.astream(messages, **kwargs)
+        try:
+            first = await asyncio.wait_for(chunks.__anext__(), timeout=tier.timeout)
+        except BaseException:
+            llm_calls.inc(tier=tier.name, outcome="error")
+            await chunks.aclose()
+            raise
+        llm_calls.inc(tier=tier.name, outcome="ok")
+        return chunks, first
+
+
+def build_router() -> ModelRouter:
+    large = ModelTier("large", settings.llm_model, settings.openai_base_url, settings.llm_large_timeout_seconds)
+    small = None
+    if settings.llm_small_model:
+        small = ModelTier(
+            "small",
+            settings.llm_small_model,
+            settings.llm_small_base_url or settings.openai_base_url,
+            settings.llm_small_timeout_seconds,
+        )
+    return ModelRouter(large, small)
+
+
+router = build_router()
+
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+registry.register(Gauge(
+    "llm_circuit_state", "Circuit breaker state per tier (0 closed, 1 half-open, 2 open)",
+    lambda: {(name,): _BREAKER_STATES[tier.breaker.state] for name, tier in router.tiers.items()},
+    labelnames=("tier",),
+))
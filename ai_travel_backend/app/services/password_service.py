@@ -0,0 +1,71 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+
+# Module-level so the process pool can pickle them; each worker process
+# builds its own context once.
+@lru_cache(maxsize=None)
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    # new_hash is set when the stored hash used different bcrypt rounds.
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+class PasswordService:
+    # bcrypt takes ~250ms at 12 rounds; running it on the event loop stalls
+    # every other request on the worker, so it runs on a dedicated pool.
+    # The semaphore bounds queued work so a login burst applies backpressure
+    # instead of growing the executor queue without limit.
+    def __init__(self, rounds: int, workers: int, max_pending: int, use_processes: bool = False):
+        self.rounds = rounds
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=workers) if use_processes
+            else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        )
+        self._pending = asyncio.Semaphore(max_pending)
+
+    async def _run(self, fn, *args):
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(_verify_and_update, password, hashed, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        valid, _ = await self.verify_and_update(password, hashed)
+        return valid
+
+    # Blocking variants for scripts and other non-async callers
+    def hash_sync(self, password: str) -> str:
+        return _hash(password, self.rounds)
+
+    def verify_sync(self, password: str, hashed: str) -> bool:
+        return _context(self.rounds).verify(password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_service = PasswordService(
+    rounds=settings.bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    max_pending=settings.password_hash_max_pending,
+    use_processes=settings.password_hash_use_processes,
+)
@@ -0,0 +1,206 @@
+# Prompt templates for itinerary generation, sized in tokens.
+#
+# The schema is described once in compact form instead of a pretty-printed
+# example, the model is asked for minified JSON, and every call carries a
+# max_tokens budget derived from the trip length so long trips can't run
+# away (or get cut off mid-JSON because nothing reserved room for them).
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from app.core.config import settings
+from app.core.metrics import Histogram, registry
+from app.models.itinerary import PackagePlan
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_COUNT = 3
+
+ACTIVITY_SCHEMA = '{"time":"HH:MM AM","place":str,"activity":str,"cost":"$N"}'
+DAY_SCHEMA = '{"day":int,"date":"YYYY-MM-DD","activities":[' + ACTIVITY_SCHEMA + ']}'
+
+PACKAGE_FIELDS = (
+    ("package_id", "str"),
+    ("title", "str"),
+    ("days", f"[{DAY_SCHEMA}]"),
+    ("total_cost_estimate", '"$N"'),
+    ("accommodation", '{"name":str,"cost_per_night":"$N","amenities":[str]}'),
+    ("local_transport", "[str]"),
+    ("visa_required", "bool"),
+    ("notes", "str"),
+)
+
+
+def package_schema(omit: Tuple[str, ...] = ()) -> str:
+    # Fields filled in without the model (see destination_kb) are left out.
+    return "{" + ",".join(f'"{name}":{kind}' for name, kind in PACKAGE_FIELDS if name not in omit) + "}"
+
+
+PACKAGE_SCHEMA = package_schema()
+
+# Rough completion sizes, measured on minified GPT-4 output.
+PACKAGE_TOKENS = 130  # title, accommodation, transport, notes
+DAY_TOKENS = 25
+ACTIVITY_TOKENS = 32
+PLAN_TOKENS = 40  # one planner entry: title + theme
+HEADROOM = 1.25
+
+prompt_tokens = registry.register(Histogram(
+    "llm_prompt_tokens", "Prompt size in tokens (tiktoken estimate) per template", ("template",),
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192),
+))
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # tiktoken downloads its BPE file with a blocking HTTP call on first
+    # use, so this runs in a thread during startup (preload_tokenizer), not
+    # inside a request. TIKTOKEN_CACHE_DIR keeps the file: populate it when
+    # building the image (python -c "from app.services.prompts import
+    # preload_tokenizer; preload_tokenizer()") and workers never download.
+    # Without network access or a cache, fall back to a character estimate.
+    if settings.tiktoken_cache_dir:
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", settings.tiktoken_cache_dir)
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(settings.llm_model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("tiktoken unavailable, estimating tokens from length", extra={"error": str(e)})
+        return None
+
+
+def preload_tokenizer() -> None:
+    _encoding()
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[BaseMessage]) -> int:
+    # ~4 tokens of chat framing per message
+    return sum(count_tokens(str(m.content)) + 4 for m in messages)
+
+
+def record_prompt(template: str, messages: List[BaseMessage]) -> int:
+    tokens = count_message_tokens(messages)
+    prompt_tokens.observe(tokens, template=template)
+    return tokens
+
+
+@dataclass
+class OutputBudget:
+    max_tokens: int
+    activities_per_day: int
+
+    def llm_options(self) -> dict:
+        options = {"max_tokens": self.max_tokens}
+        if settings.llm_json_mode:
+            options["response_format"] = {"type": "json_object"}
+        return options
+
+
+def output_budget(days: int, packages: int = PACKAGE_COUNT) -> OutputBudget:
+    # Fewer activities per day on long trips, so the full plan still fits
+    # under llm_max_output_tokens.
+    days = max(days, 1)
+    for activities in (4, 3, 2):
+        per_package = PACKAGE_TOKENS + days * (DAY_TOKENS + activities * ACTIVITY_TOKENS)
+        needed = int(packages * per_package * HEADROOM)
+        if needed <= settings.llm_max_output_tokens:
+            return OutputBudget(needed, activities)
+    return OutputBudget(settings.llm_max_output_tokens, 2)
+
+
+def planner_budget(packages: int = PACKAGE_COUNT) -> OutputBudget:
+    return OutputBudget(int((20 + packages * PLAN_TOKENS) * HEADROOM), 0)
+
+
+def day_budget(activities: int = 4) -> OutputBudget:
+    return OutputBudget(int((DAY_TOKENS + activities * ACTIVITY_TOKENS) * HEADROOM), activities)
+
+
+def activity_budget() -> OutputBudget:
+    return OutputBudget(int(ACTIVITY_TOKENS * 2 * HEADROOM), 1)
+
+
+_DAYS = re.compile(r"(\d{1,2})\s*-?\s*(day|night)s?\b", re.I)
+_WEEKS = re.compile(r"(\d{1,2}|a|one|two)\s*-?\s*weeks?\b", re.I)
+_WEEK_WORDS = {"a": 1, "one": 1, "two": 2}
+
+
+def trip_days_from_prompt(prompt: str) -> Optional[int]:
+    match = _DAYS.search(prompt)
+    if match:
+        days = int(match.group(1))
+        return days + 1 if match.group(2).lower() == "night" else days
+    match = _WEEKS.search(prompt)
+    if match:
+        weeks = match.group(1).lower()
+        return 7 * (int(weeks) if weeks.isdigit() else _WEEK_WORDS[weeks])
+    return None
+
+
+def packages_prompt(brief: str, days_hint: str, budget: OutputBudget, schema: str = PACKAGE_SCHEMA) -> str:
+    return f"""Act as a travel assistant. Suggest {PACKAGE_COUNT} distinct travel packages for this trip:
+{brief}
+Give day-wise plans for {days_hint}, up to {budget.activities_per_day} activities per day, with time for breaks.
+Reply with minified JSON only (no markdown, no comments): {{"packages":[P,...]}} where P is
+{schema}
+Keep place, activity and notes text short."""
+
+
+def planner_prompt(brief: str) -> str:
+    return f"""Act as a travel assistant. Plan {PACKAGE_COUNT} distinct travel packages for this trip:
+{brief}
+Reply with minified JSON only, a short title and a one-sentence theme per package:
+{{"packages":[{{"title":str,"theme":str}}]}}"""
+
+
+def single_package_prompt(
+    brief: str, days_hint: str, plan: PackagePlan, others: List[PackagePlan], budget: OutputBudget,
+    schema: str = PACKAGE_SCHEMA,
+) -> str:
+    other_titles = ", ".join(o.title for o in others) or "nothing yet"
+    return f"""Act as a travel assistant. Write the complete itinerary for one travel package.
+Trip:
+{brief}
+Package title: {plan.title}
+Package theme: {plan.theme}
+The other packages cover: {other_titles}. Keep this one distinct.
+Reply with minified JSON only (no markdown, no comments) for this single package, with day-wise plans
+for {days_hint}, up to {budget.activities_per_day} activities per day:
+{schema}"""
+
+
+# Follow-up edits (itinerary_edit): rewrite one day, or one activity, of
+# an existing package.
+def day_prompt(title: str, day_json: str, other_days: str, instruction: Optional[str], budget: OutputBudget) -> str:
+    return f"""Act as a travel assistant. Rewrite one day of the travel package "{title}".
+Current day: {day_json}
+Other days of the trip: {other_days or "none"}
+Change: {instruction or "a different plan for this day"}
+Keep the same day and date, don't repeat places from the other days, up to {budget.activities_per_day} activities.
+Reply with minified JSON only (no markdown, no comments) for this day:
+{DAY_SCHEMA}"""
+
+
+def activity_prompt(title: str, day_json: str, index: int, instruction: Optional[str]) -> str:
+    return f"""Act as a travel assistant. Replace activity {index} of this day of the travel package "{title}".
+Day: {day_json}
+Change: {instruction or "a different activity at about the same time"}
+Don't repeat the day's other places.
+Reply with minified JSON only (no markdown, no comments) for the new activity:
+{ACTIVITY_SCHEMA}"""
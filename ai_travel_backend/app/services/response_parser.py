@@ -0,0 +1,137 @@
+# Turns raw model output into validated models without eval().
+#
+# Each step only runs when the cheaper one before it fails:
+#   clean     - the text is valid JSON for the model (pydantic-core JSON mode)
+#   fenced    - valid once markdown fences / surrounding prose are removed
+#   repaired  - valid after fixing trailing commas, comments, Python literals
+#   salvaged  - truncated or partly invalid; the complete, valid packages are kept
+
+import json
+import re
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.metrics import span
+from app.models.itinerary import Package, PackageResponse
+from app.services.stream_parser import PackageStreamParser
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_REPAIR_TOKENS = re.compile(
+    r'"(?:\\.|[^"\\])*"'  # string literal
+    r"|//[^\n]*|/\*.*?\*/"  # comments
+    r"|,(?=\s*[}\]])"  # trailing comma
+    r"|\b(?:True|False|None)\b",  # Python literals
+    re.DOTALL,
+)
+
+
+class ResponseParseError(ValueError):
+    pass
+
+
+def strip_code_fences(text: str) -> str:
+    match = _FENCE.search(text)
+    if match:
+        return match.group(1)
+    # An unterminated fence (truncated output) still has an opening line.
+    if text.lstrip().startswith("```"):
+        return text.lstrip()[3:].split("\n", 1)[-1]
+    return text
+
+
+def extract_json(text: str) -> str:
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        return text
+    start = min(starts)
+    end = max(text.rfind("}"), text.rfind("]"))
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def repair_json(text: str) -> str:
+    # Strings are matched first and kept verbatim, so the fixes below only
+    # apply outside them.
+    def fix(match):
+        token = match.group(0)
+        if token[0] == '"':
+            return token
+        if token[0] in ",/":
+            return ""
+        return _PY_LITERALS[token]
+
+    return _REPAIR_TOKENS.sub(fix, text)
+
+
+def _validate_response(text: str) -> Optional[PackageResponse]:
+    try:
+        with span("response.validate"):
+            return PackageResponse.model_validate_json(text)
+    except ValidationError:
+        pass
+    # Some replies are a bare list of packages rather than {"packages": [...]}.
+    if text.lstrip().startswith("["):
+        try:
+            return PackageResponse.model_validate_json('{"packages": ' + text + "}")
+        except ValidationError:
+            return None
+    return None
+
+
+def _salvage_packages(text: str) -> List[Package]:
+    parser = PackageStreamParser()
+    packages = []
+    for item in parser.feed(text):
+        try:
+            packages.append(Package.model_validate(item))
+        except ValidationError:
+            continue
+    return packages
+
+
+def parse_package_response_with_outcome(text: str) -> Tuple[PackageResponse, str]:
+    response = _validate_response(text)
+    if response is not None:
+        return response, "clean"
+
+    cleaned = extract_json(strip_code_fences(text)).strip()
+    response = _validate_response(cleaned)
+    if response is not None:
+        return response, "fenced"
+
+    repaired = repair_json(cleaned)
+    response = _validate_response(repaired)
+    if response is not None:
+        return response, "repaired"
+
+    packages = _salvage_packages(repaired)
+    if packages:
+        return PackageResponse(packages=packages), "salvaged"
+
+    raise ResponseParseError("Model output did not contain any valid package")
+
+
+def parse_package_response(text: str) -> PackageResponse:
+    return parse_package_response_with_outcome(text)[0]
+
+
+def parse_model(text: str, model: type[BaseModel]) -> BaseModel:
+    # For single-object replies (one package, one day plan, ...).
+    try:
+        return model.model_validate_json(text)
+    except ValidationError:
+        pass
+    cleaned = repair_json(extract_json(strip_code_fences(text)).strip())
+    try:
+        return model.model_validate_json(cleaned)
+    except ValidationError as e:
+        raise ResponseParseError(f"Model output is not a valid {model.__name__}") from e
+
+
+def parse_json_object(text: str) -> dict:
+    cleaned = repair_json(extract_json(strip_code_fences(text)).strip())
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        raise ResponseParseError("Model output is not valid JSON") from e
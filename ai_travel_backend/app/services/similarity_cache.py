@@ -0,0 +1,178 @@
+# Reuse of past generations for free-text prompts that are worded
+# differently but ask for the same trip ("relaxing beach week in Bali in
+# July" / "chill week on Bali beaches, July"), which the exact intent key
+# misses whenever the extracted mood or interests differ slightly.
+#
+# Matches are only considered within the same scope (destination, month,
+# trip length, travel type and budget band from the intent), so a high
+# text similarity never returns another destination's plans, or a solo
+# plan to a family. Within a scope, the prompt plus the intent's mood and
+# interests (which normalise "chill" to "relaxing" and so on) are
+# embedded offline as hashed word, word-bigram and character-trigram
+# counts, weighted by TF-IDF over the indexed prompts, and compared by
+# cosine similarity. The threshold is calibrated on labelled pairs with
+# benchmarks.bench_similarity.
+#
+# The index is per worker and in memory; the oldest entries are
+# overwritten once it is full.
+
+import itertools
+import logging
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, registry
+from app.models.itinerary import PackageResponse, TravelIntent
+from app.services.cache import normalize_text
+from app.services.destination_kb import budget_band, find_destination
+
+logger = logging.getLogger(__name__)
+
+similarity_lookups = registry.register(Counter(
+    "similarity_cache_lookups_total", "Similar-prompt lookups", ("result",)))
+similarity_scores = registry.register(Histogram(
+    "similarity_cache_best_score", "Cosine similarity of the closest indexed prompt in scope",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+))
+
+_WORD = re.compile(r"[^\W_]+")
+# Filler that says nothing about the trip; everything else is left to IDF.
+_STOPWORDS = frozenset(
+    "a an and at for i in me my of on or plan please some the to trip travel want we with".split()
+)
+
+
+def _budget_scope(intent: TravelIntent, days: int) -> str:
+    # The band rather than the wording, so "cheap" and "budget" share a
+    # scope; budgets that name no band are only matched as written.
+    destination = find_destination(intent.destination) if intent.destination else None
+    band = destination.band(intent.budget, days) if destination else budget_band(intent.budget)
+    return band or normalize_text(intent.budget)
+
+
+def similarity_scope(intent: TravelIntent, days: int) -> str:
+    return "|".join([
+        normalize_text(intent.destination), normalize_text(intent.preferred_month), str(days),
+        normalize_text(intent.travel_type), _budget_scope(intent, days),
+    ])
+
+
+def similarity_text(prompt: str, intent: TravelIntent) -> str:
+    # Scope words are the same for every candidate, so they are left out.
+    scope_words = set(_WORD.findall(normalize_text(f"{intent.destination} {intent.preferred_month}")))
+    parts = [prompt, intent.mood, " ".join(intent.interests)]
+    words = _WORD.findall(normalize_text(" ".join(part for part in parts if part)))
+    return " ".join(word for word in words if word not in scope_words)
+
+
+def features(text: str) -> List[str]:
+    words = [word for word in _WORD.findall(normalize_text(text)) if word not in _STOPWORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class PromptIndex:
+    def __init__(self, dim: int = 2048, max_entries: int = 1000):
+        self.dim = dim
+        self.max_entries = max_entries
+        self._tf = np.zeros((max_entries, dim), dtype=np.float32)  # log-scaled term counts per row
+        self._df = np.zeros(dim, dtype=np.float32)  # rows containing each bucket
+        self._scopes = np.full(max_entries, -1, dtype=np.int64)
+        self._scope_ids: Dict[str, int] = {}  # scopes with at least one live row
+        self._scope_rows: Dict[str, int] = {}
+        self._row_scopes: List[Optional[str]] = [None] * max_entries
+        self._new_scope_id = itertools.count()
+        self._responses: List[Optional[PackageResponse]] = [None] * max_entries
+        self._next = 0
+        self._count = 0
+        self._matrix = None  # idf-weighted, L2-normalised rows; rebuilt on the first search after a change
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _term_vector(self, text: str) -> np.ndarray:
+        buckets = [zlib.crc32(gram.encode()) % self.dim for gram in features(text)]
+        counts = np.bincount(np.asarray(buckets, dtype=np.int64), minlength=self.dim)
+        return np.log1p(counts, dtype=np.float32)
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1 + self._count) / (1 + self._df)) + 1
+
+    def add(self, text: str, scope: str, response: PackageResponse) -> None:
+        row = self._next
+        if self._responses[row] is not None:
+            self._df -= self._tf[row] > 0
+            self._release_scope(self._row_scopes[row])
+        self._tf[row] = self._term_vector(text)
+        self._df += self._tf[row] > 0
+        if scope not in self._scope_ids:
+            self._scope_ids[scope] = next(self._new_scope_id)
+        self._scope_rows[scope] = self._scope_rows.get(scope, 0) + 1
+        self._scopes[row] = self._scope_ids[scope]
+        self._row_scopes[row] = scope
+        self._responses[row] = response
+        self._next = (row + 1) % self.max_entries
+        self._count = min(self._count + 1, self.max_entries)
+        self._matrix = None
+
+    def _release_scope(self, scope: str) -> None:
+        # Forget a scope once its last row is overwritten, so the mapping
+        # stays bounded by max_entries. Ids are never reused.
+        self._scope_rows[scope] -= 1
+        if not self._scope_rows[scope]:
+            del self._scope_rows[scope]
+            del self._scope_ids[scope]
+
+    def search(self, text: str, scope: str, k: int = 1) -> List[Tuple[float, PackageResponse]]:
+        # Top k (score, response) pairs in scope, best first.
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None or not self._count:
+            return []
+        idf = self._idf()
+        if self._matrix is None:
+            weighted = self._tf[:self._count] * idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            self._matrix = weighted / np.maximum(norms, 1e-12)
+        query = self._term_vector(text) * idf
+        norm = np.linalg.norm(query)
+        if not norm:
+            return []
+        scores = self._matrix @ (query / norm)
+        scores[self._scopes[:self._count] != scope_id] = -1.0
+        k = min(k, self._count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self._responses[i]) for i in top if scores[i] >= 0]
+
+
+class SimilarPromptCache:
+    def __init__(self, index: PromptIndex, threshold: float):
+        self.index = index
+        self.threshold = threshold
+
+    def get(self, prompt: str, intent: TravelIntent, days: int) -> Optional[PackageResponse]:
+        # The stored response is shared: callers copy it before changing it.
+        matches = self.index.search(similarity_text(prompt, intent), similarity_scope(intent, days))
+        if matches:
+            similarity_scores.observe(matches[0][0])
+        if matches and matches[0][0] >= self.threshold:
+            similarity_lookups.inc(result="hit")
+            return matches[0][1]
+        similarity_lookups.inc(result="miss")
+        return None
+
+    def set(self, prompt: str, intent: TravelIntent, days: int, response: PackageResponse) -> None:
+        self.index.add(similarity_text(prompt, intent), similarity_scope(intent, days), response)
+
+
+similar_prompts = SimilarPromptCache(
+    PromptIndex(dim=settings.similarity_cache_dim, max_entries=settings.similarity_cache_max_entries),
+    threshold=settings.similarity_cache_threshold,
+)
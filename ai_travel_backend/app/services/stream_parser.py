@@ -0,0 +1,70 @@
+import json
+from typing import Callable, List, Optional
+
+
+class PackageStreamParser:
+    """Pulls complete package objects out of a partially streamed response.
+
+    Expects the model's usual shape, {"packages": [{...}, {...}]}, or a bare
+    list of packages: any object that opens directly inside the packages
+    array is emitted as a dict as soon as its closing brace arrives. Text
+    outside the JSON (markdown fences, preambles) is skipped. An object that
+    is not valid JSON is passed through ``repair`` (response_parser.repair_json
+    for streamed replies) and dropped if it still does not load.
+    """
+
+    def __init__(self, repair: Optional[Callable[[str], str]] = None):
+        self._repair = repair
+        self._stack = []  # open "{" / "[" characters
+        self._bare_list = False  # the outer "{" was implied by a top-level "["
+        self._in_string = False
+        self._escaped = False
+        self._item = None  # characters of the package being read
+
+    def feed(self, text: str) -> List[dict]:
+        items = []
+        for char in text:
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = bool(self._stack)
+            elif char in "{[":
+                if char == "[" and not self._stack:
+                    self._stack.append("{")  # a bare list is read as the packages array
+                    self._bare_list = True
+                if char == "{" and self._stack == ["{", "["]:
+                    self._item = [char]
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "]" and self._bare_list and self._stack == ["{"]:
+                    self._stack.pop()
+                    self._bare_list = False
+                if char == "}" and self._item is not None and self._stack == ["{", "["]:
+                    item = self._load("".join(self._item))
+                    if item is not None:
+                        items.append(item)
+                    self._item = None
+        return items
+
+    def _load(self, text: str) -> Optional[dict]:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        if self._repair is not None:
+            try:
+                return json.loads(self._repair(text))
+            except json.JSONDecodeError:
+                pass
+        return None
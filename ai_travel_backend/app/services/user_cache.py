@@ -0,0 +1,44 @@
+import logging
+from typing import Optional
+
+from app.core.config import settings
+from app.models.user import Principal
+from app.services.cache import build_cache_backend
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    # Short-TTL cache of authenticated users keyed on the token's "sub".
+    # Profile writes invalidate explicitly; the TTL bounds staleness for
+    # anything else (and across workers when the backend is in-process).
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.backend = build_cache_backend(max_entries=max_entries)
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"principal:v1:{user_id}"
+
+    async def get(self, user_id: str) -> Optional[Principal]:
+        try:
+            raw = await self.backend.get(self._key(user_id))
+        except Exception as e:
+            logger.warning("principal cache get failed", extra={"user_id": user_id, "error": str(e)})
+            return None
+        return Principal.model_validate_json(raw) if raw is not None else None
+
+    async def set(self, principal: Principal) -> None:
+        try:
+            await self.backend.set(self._key(principal.user_id), principal.model_dump_json(), self.ttl)
+        except Exception as e:
+            logger.warning("principal cache set failed", extra={"user_id": principal.user_id, "error": str(e)})
+
+    async def invalidate(self, user_id: str) -> None:
+        try:
+            await self.backend.delete(self._key(user_id))
+        except Exception as e:
+            logger.warning("principal cache invalidate failed", extra={"user_id": user_id, "error": str(e)})
+
+
+principal_cache = PrincipalCache(ttl=settings.auth_cache_ttl_seconds, max_entries=settings.auth_cache_max_entries)
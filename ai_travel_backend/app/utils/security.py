@@ -1,9 +1,8 @@
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.password_service import password_service
 
+# Blocking helpers; async code should await password_service instead.
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_service.hash_sync(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_service.verify_sync(plain_password, hashed_password)
@@ -0,0 +1,46 @@
+# Standalone itinerary job worker, for running generation outside the API
+# processes. Needs the shared queue (JOBS_BROKER=database); set
+# JOBS_WORKERS=0 on the API so it only accepts jobs.
+#
+#   JOBS_BROKER=database python -m app.workers.itinerary_worker --workers 8
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.db.db import dispose_engine
+from app.services.job_queue import JobWorkerPool, job_broker
+
+logger = logging.getLogger(__name__)
+
+
+async def run(workers: int) -> None:
+    pool = JobWorkerPool(job_broker, workers)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    pool.start()
+    logger.info("itinerary worker started", extra={"workers": workers})
+    await stop.wait()
+    await pool.stop()
+    await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Itinerary generation job worker")
+    parser.add_argument("--workers", type=int, default=max(settings.jobs_workers, 1))
+    args = parser.parse_args()
+
+    setup_logging()
+    if settings.jobs_broker != "database":
+        raise SystemExit("The standalone worker needs JOBS_BROKER=database to share the API's queue")
+    asyncio.run(run(args.workers))
+
+
+if __name__ == "__main__":
+    main()
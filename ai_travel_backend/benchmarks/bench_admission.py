@@ -0,0 +1,104 @@
+# Latency of regular users while one user floods /suggest-packages/prompt.
+# LLM_MAX_CONCURRENCY stands in for the OpenAI quota in both runs; without
+# admission control the flood queues ahead of everyone on that semaphore.
+#
+#   python -m benchmarks.bench_admission --duration 30
+#   python -m benchmarks.bench_admission --duration 30 --no-admission
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+from benchmarks.common import percentile
+from benchmarks.fake_openai import create_app, serve_in_thread
+
+
+async def flood(client, deadline, statuses):
+    # One of the abuser's connections: back-to-back requests, honouring
+    # nothing and rotating the body's user_id (admission keys on the client).
+    while time.monotonic() < deadline:
+        user_id = f"abuser-{sum(statuses.values())}"
+        response = await client.post("/suggest-packages/prompt", json={"user_id": user_id, "prompt": "3 days in Rome"})
+        statuses[response.status_code] += 1
+        if response.status_code == 429:
+            await asyncio.sleep(0.05)
+
+
+async def regular(client, user, deadline, think, latencies, statuses):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/suggest-packages/prompt", json={"user_id": user, "prompt": "3 days in Lisbon"})
+        statuses[response.status_code] += 1
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(think)
+
+
+async def main_async(args):
+    import httpx
+    from app.main import create_app as create_api
+
+    app = create_api()
+    deadline = time.monotonic() + args.duration
+    latencies, regular_statuses, abuser_statuses = [], Counter(), Counter()
+
+    def client_from(address: str) -> httpx.AsyncClient:
+        # Anonymous callers are told apart by client address.
+        transport = httpx.ASGITransport(app=app, client=(address, 50000))
+        return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120)
+
+    async with app.router.lifespan_context(app):
+        abuser = client_from("10.0.0.1")
+        users = [client_from(f"10.0.1.{i}") for i in range(args.users)]
+        try:
+            await asyncio.gather(
+                *(flood(abuser, deadline, abuser_statuses) for _ in range(args.abuser_connections)),
+                *(regular(client, f"user-{i}", deadline, args.think, latencies, regular_statuses)
+                  for i, client in enumerate(users)),
+            )
+        finally:
+            for client in (abuser, *users):
+                await client.aclose()
+
+    label = "without admission" if args.no_admission else "with admission"
+    print(f"{label}: regular users {dict(regular_statuses)}, abuser {dict(abuser_statuses)}")
+    if latencies:
+        print(
+            f"  regular latency p50 {statistics.median(latencies):5.2f}s  "
+            f"p95 {percentile(latencies, 95):5.2f}s  p99 {percentile(latencies, 99):5.2f}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--think", type=float, default=10.0, help="pause between a regular user's requests")
+    parser.add_argument("--abuser-connections", type=int, default=50)
+    parser.add_argument("--quota", type=int, default=8, help="concurrent LLM calls this worker may make")
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--no-admission", action="store_true")
+    args = parser.parse_args()
+
+    serve_in_thread(create_app(latency=args.latency, token_rate=1e6), args.port)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.update({
+        "CACHE_ENABLED": "false",
+        "COALESCE_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "LLM_MAX_CONCURRENCY": str(args.quota),
+        "ADMISSION_MAX_ACTIVE": str(args.quota),
+        "ADMISSION_ENABLED": str(not args.no_admission).lower(),
+    })
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
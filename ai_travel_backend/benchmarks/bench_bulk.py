@@ -0,0 +1,109 @@
+# /suggest-packages/filters/bulk against the stub LLM: time to the first
+# NDJSON line, total time and items per second for a batch with some
+# repeated items, versus one blocking /suggest-packages/filters call per
+# item. --malformed-rate and --error-rate show per-item failures.
+#
+#   python -m benchmarks.bench_bulk --items 200 --unique 50 --concurrency 8
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from benchmarks.fake_openai import create_app, serve_in_thread
+
+DESTINATIONS = ["Paris", "Rome", "Tokyo", "Bali", "Lisbon", "Dubai", "Bangkok", "New York", "Cape Town", "Sydney"]
+
+
+def batch(items: int, unique: int):
+    start = date(2026, 1, 1)
+    distinct = [
+        {
+            "user_id": "partner",
+            "destination": DESTINATIONS[i % len(DESTINATIONS)],
+            "from_date": str(start + timedelta(days=7 * (i // len(DESTINATIONS)))),
+            "to_date": str(start + timedelta(days=7 * (i // len(DESTINATIONS)) + 2)),
+            "budget": "medium",
+        }
+        for i in range(unique)
+    ]
+    return [distinct[i % unique] for i in range(items)]
+
+
+async def main_async(args):
+    import httpx
+    from app.main import create_app as create_api
+
+    # Under uvicorn rather than ASGITransport, which buffers whole responses.
+    server = serve_in_thread(create_api(), args.port + 1)
+    items = batch(args.items, args.unique)
+    body = "\n".join(json.dumps(item) for item in items)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port + 1}", timeout=600) as client:
+            start = time.perf_counter()
+            first, statuses, summary = None, Counter(), None
+            async with client.stream(
+                "POST", "/suggest-packages/filters/bulk", content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            ) as response:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    first = first or time.perf_counter() - start
+                    record = json.loads(line)
+                    if record.get("done"):
+                        summary = record
+                    else:
+                        statuses["ok" if record["ok"] else "error"] += 1
+            elapsed = time.perf_counter() - start
+            print(
+                f"bulk      {args.items} items ({args.unique} distinct) in {elapsed:6.2f}s  "
+                f"{args.items / elapsed:6.1f} items/s  first line {first:5.2f}s  {dict(statuses)}"
+            )
+            print(f"          summary {summary}")
+
+            if args.serial:
+                start = time.perf_counter()
+                for item in items[: args.serial]:
+                    await client.post("/suggest-packages/filters", json=item)
+                elapsed = time.perf_counter() - start
+                print(f"serial    {args.serial} items in {elapsed:6.2f}s  {args.serial / elapsed:6.1f} items/s")
+    finally:
+        server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--serial", type=int, default=20, help="items to also send one call at a time (0 to skip)")
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    serve_in_thread(
+        create_app(latency=args.latency, malformed_rate=args.malformed_rate, error_rate=args.error_rate),
+        args.port,
+    )
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.update({
+        "CACHE_ENABLED": "false",  # every distinct item reaches the model
+        "LOG_LEVEL": "WARNING",
+        "BULK_CONCURRENCY": str(args.concurrency),
+        "ADMISSION_ENABLED": "false",  # the serial run would otherwise hit the per-user rate
+        "LLM_MAX_RETRIES": "0",
+    })
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
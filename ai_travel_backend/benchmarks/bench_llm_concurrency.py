@@ -0,0 +1,62 @@
+# Throughput of the old sync LLM path (chat.invoke on Starlette's threadpool)
+# versus the async path (ainvoke_chat) against the fake OpenAI server.
+#
+#   python -m benchmarks.bench_llm_concurrency --requests 400 --latency 2
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.common import percentile
+from benchmarks.fake_openai import create_app, serve_in_thread
+
+
+async def run(label, call, total):
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} {total} calls in {elapsed:6.2f}s  "
+        f"{total / elapsed:7.1f} req/s  "
+        f"p50 {statistics.median(latencies):5.2f}s  p99 {percentile(latencies, 99):5.2f}s"
+    )
+
+
+async def main_async(args):
+    from langchain_core.messages import HumanMessage
+    from starlette.concurrency import run_in_threadpool
+    from app.services.llm import ainvoke_chat
+    from app.services.llm_router import router
+
+    chat = router.tiers["large"].client
+    messages = [HumanMessage(content="Suggest 3 packages for Dubai")]
+    await run("sync invoke (threadpool)", lambda: run_in_threadpool(chat.invoke, messages), args.requests)
+    await run("async ainvoke", lambda: ainvoke_chat(messages), args.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    serve_in_thread(create_app(latency=args.latency), args.port)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
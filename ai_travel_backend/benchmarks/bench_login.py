@@ -0,0 +1,97 @@
+# Login latency under concurrent load with bcrypt on the event loop
+# ("inline", the old behaviour) versus the bounded hashing executor.
+#
+#   python -m benchmarks.bench_login --logins 64 --concurrency 32 --rounds 12
+#
+# Runs the real /auth/login route in-process against a throwaway SQLite DB.
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+
+async def heartbeat(lags, stop):
+    # Measures how late a 10ms timer fires: event loop blocking shows up here.
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + 0.01
+        await asyncio.sleep(0.01)
+        lags.append(loop.time() - expected)
+
+
+async def run(label, client, args):
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            response = await client.post("/auth/login", json={"email": "bench@example.com", "password": "secret"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    print(
+        f"{label:<10} {args.logins / elapsed:6.1f} logins/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.0f}ms  p99 {percentile(latencies, 99) * 1000:7.0f}ms  "
+        f"max loop lag {max(lags) * 1000:6.0f}ms"
+    )
+
+
+async def main_async(args):
+    import httpx
+    from app.db.db import dispose_engine, get_engine
+    from app.db.models import Base
+    from app.main import app
+    from app.services import password_service as passwords
+
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.post("/auth/register", json={"email": "bench@example.com", "password": "secret"})
+
+        service = passwords.password_service
+        threaded_run = service._run
+
+        async def inline_run(fn, *fn_args):
+            return fn(*fn_args)
+
+        service._run = inline_run
+        await run("inline", client, args)
+        service._run = threaded_run
+        await run("executor", client, args)
+
+    await dispose_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
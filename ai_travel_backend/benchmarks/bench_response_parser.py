@@ -0,0 +1,76 @@
+# Parse time and salvage rate of the response parser versus the old
+# json.loads + eval fallback, over a corpus of model outputs. The old
+# fallback is reproduced with ast.literal_eval, which accepts the same
+# Python-literal replies without executing anything in them.
+#
+#   python -m benchmarks.bench_response_parser [--corpus DIR] [--repeat N]
+#
+# Drop recorded model outputs (one reply per file) into the corpus
+# directory to benchmark against production-like data.
+
+import argparse
+import ast
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.models.itinerary import PackageResponse
+from app.services.response_parser import ResponseParseError, parse_package_response_with_outcome
+
+DEFAULT_CORPUS = Path(__file__).parent / "corpus" / "responses"
+
+
+def legacy_parse(text):
+    # The previous itinerary_service behaviour, kept for comparison only.
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        parsed = ast.literal_eval(text)
+    return PackageResponse(**parsed)
+
+
+def new_parse(text):
+    return parse_package_response_with_outcome(text)
+
+
+def measure(parse, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = parse(text)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    files = sorted(p for p in args.corpus.iterdir() if p.is_file())
+    outcomes = Counter()
+    legacy_ok = 0
+    print(f"{'file':<24} {'legacy':>12} {'parser':>12}  outcome")
+    for path in files:
+        text = path.read_text()
+        try:
+            legacy_time, _ = measure(legacy_parse, text, args.repeat)
+            legacy_cell = f"{legacy_time * 1e6:9.1f}us"
+            legacy_ok += 1
+        except Exception:
+            legacy_cell = "failed"
+        try:
+            new_time, (response, outcome) = measure(new_parse, text, args.repeat)
+            new_cell = f"{new_time * 1e6:9.1f}us"
+            outcome = f"{outcome} ({len(response.packages)} packages)"
+            outcomes["ok"] += 1
+        except ResponseParseError:
+            new_cell, outcome = "failed", "unrecoverable"
+        print(f"{path.name:<24} {legacy_cell:>12} {new_cell:>12}  {outcome}")
+
+    total = len(files)
+    print(f"\nlegacy parsed {legacy_ok}/{total}, parser recovered {outcomes['ok']}/{total}")
+
+
+if __name__ == "__main__":
+    main()
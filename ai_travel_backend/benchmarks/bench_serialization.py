@@ -0,0 +1,63 @@
+# Cost of turning a PackageResponse into response bytes, by trip length:
+# FastAPI's default path for a returned model (dump, re-validate against
+# response_model, serialize, json.dumps) versus FastJSONResponse, plus
+# the size and time of gzip/zstd on the result.
+#
+#   python -m benchmarks.bench_serialization --days 3 7 14 30
+
+import argparse
+import asyncio
+import gzip
+import time
+
+import zstandard
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import FastJSONResponse
+from app.models.itinerary import PackageResponse
+from benchmarks.fake_openai import sample_packages
+
+
+def per_call(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+async def fastapi_default(field, response: PackageResponse) -> bytes:
+    content = await serialize_response(field=field, response_content=response)
+    return JSONResponse(content).body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 14, 30])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    field = create_model_field(name="Response_bench", type_=PackageResponse, mode="serialization")
+    loop = asyncio.new_event_loop()
+    zstd = zstandard.ZstdCompressor(level=3)
+
+    print(f"{'days':>4} {'bytes':>7} {'fastapi':>9} {'fast':>8} {'gzip':>15} {'zstd':>15}")
+    for days in args.days:
+        response = PackageResponse.model_validate(sample_packages(days=days))
+        body = FastJSONResponse(response).body
+        default = per_call(lambda: loop.run_until_complete(fastapi_default(field, response)), args.repeat)
+        fast = per_call(lambda: FastJSONResponse(response), args.repeat)
+        gzip_time = per_call(lambda: gzip.compress(body, compresslevel=6, mtime=0), args.repeat)
+        zstd_time = per_call(lambda: zstd.compress(body), args.repeat)
+        print(
+            f"{days:>4} {len(body):>7} {default * 1e6:>7.0f}us {fast * 1e6:>6.0f}us "
+            f"{len(gzip.compress(body, 6, mtime=0)):>6}B {gzip_time * 1e6:>5.0f}us "
+            f"{len(zstd.compress(body)):>6}B {zstd_time * 1e6:>5.0f}us"
+        )
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
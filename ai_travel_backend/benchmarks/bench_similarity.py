@@ -0,0 +1,91 @@
+# Precision and recall of the similar-prompt cache over a labelled set of
+# prompt pairs (corpus/similarity_pairs.jsonl): "same" pairs ask for the
+# same trip in different words, the others share a destination, month and
+# length but want a different trip. For each threshold, a pair counts as
+# served when the second prompt finds the first above it; a served
+# non-paraphrase is a wrong plan handed to a user.
+#
+#   python -m benchmarks.bench_similarity [--pairs FILE] [--min-precision 1.0]
+
+import argparse
+import json
+from pathlib import Path
+
+from app.models.itinerary import TravelIntent
+from app.services.similarity_cache import PromptIndex, similarity_scope, similarity_text
+
+DEFAULT_PAIRS = Path(__file__).parent / "corpus" / "similarity_pairs.jsonl"
+
+
+def load_pairs(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def side(entry):
+    intent = TravelIntent(**entry["intent"])
+    return similarity_text(entry["prompt"], intent), similarity_scope(intent, intent.duration_days)
+
+
+def scores(pairs):
+    # Each pair gets its own scope so it only ever finds its own partner,
+    # while the IDF weights come from every indexed prompt as in production.
+    # None when the two prompts fall in different scopes.
+    index = PromptIndex(max_entries=len(pairs))
+    queries = []
+    for i, pair in enumerate(pairs):
+        text, scope = side(pair["a"])
+        index.add(text, f"{i}|{scope}", i)
+        text, scope = side(pair["b"])
+        queries.append((text, f"{i}|{scope}"))
+    results = []
+    for text, scope in queries:
+        matches = index.search(text, scope)
+        results.append(matches[0][0] if matches else None)
+    return results
+
+
+def evaluate(pairs, results, threshold):
+    served = [score is not None and score >= threshold for score in results]
+    tp = sum(1 for pair, hit in zip(pairs, served) if hit and pair["same"])
+    fp = sum(1 for pair, hit in zip(pairs, served) if hit and not pair["same"])
+    positives = sum(1 for pair in pairs if pair["same"])
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    return precision, tp / positives if positives else 0.0, tp, fp
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=Path, default=DEFAULT_PAIRS)
+    parser.add_argument("--min-precision", type=float, default=1.0)
+    parser.add_argument("--verbose", action="store_true", help="print every pair's score")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.pairs)
+    results = scores(pairs)
+    positives = sum(1 for pair in pairs if pair["same"])
+    print(f"{len(pairs)} pairs: {positives} paraphrases, {len(pairs) - positives} different trips, "
+          f"{sum(r is None for r in results)} kept apart by scope")
+    if args.verbose:
+        for pair, score in sorted(zip(pairs, results), key=lambda item: -(item[1] or -1)):
+            cell = "scope" if score is None else f"{score:.3f}"
+            print(f"  {cell:>6} {'same' if pair['same'] else 'diff'}  {pair['a']['prompt']!r} / {pair['b']['prompt']!r}")
+
+    print(f"\n{'threshold':>9} {'precision':>9} {'recall':>7} {'served':>7} {'wrong':>6}")
+    best = None
+    for step in range(30, 96, 5):
+        threshold = step / 100
+        precision, recall, tp, fp = evaluate(pairs, results, threshold)
+        print(f"{threshold:9.2f} {precision:9.2f} {recall:7.2f} {tp:7} {fp:6}")
+        if best is None and precision >= args.min_precision:
+            best = threshold, precision, recall
+    hardest = max((score for pair, score in zip(pairs, results) if not pair["same"] and score is not None), default=None)
+    if hardest is not None:
+        print(f"\nclosest different trip in scope: {hardest:.3f}")
+    if best:
+        print(f"lowest threshold with precision >= {args.min_precision}: "
+              f"{best[0]:.2f} (precision {best[1]:.2f}, recall {best[2]:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Cold-start cost of an API worker: each run is a fresh interpreter that
+# imports app.main, runs the lifespan startup, then times its first plain
+# request (/metrics) and its first two LLM-backed requests against the
+# fake OpenAI server. The first LLM request includes the lazy client setup.
+#
+#   python -m benchmarks.bench_startup --runs 5
+#   python -m benchmarks.bench_startup --preload      # LLM_PRELOAD=true
+#   python -m benchmarks.bench_startup --no-secrets   # import + /metrics only
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import BACKEND_DIR, free_port
+from benchmarks.fake_openai import create_app, serve_in_thread
+
+STAGES = ("import", "startup", "first_request", "first_llm_request", "second_llm_request")
+
+# Runs in the child process; prints one JSON object of stage timings.
+PROBE = """
+import asyncio, json, sys, time
+llm = sys.argv[1] == "llm"
+timings = {}
+start = time.perf_counter()
+from app.main import app
+timings["import"] = time.perf_counter() - start
+
+async def probe():
+    import httpx
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["startup"] = time.perf_counter() - start
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            start = time.perf_counter()
+            (await client.get("/metrics")).raise_for_status()
+            timings["first_request"] = time.perf_counter() - start
+            if llm:
+                for stage, prompt in (("first_llm_request", "3 days in Rome"), ("second_llm_request", "3 days in Oslo")):
+                    start = time.perf_counter()
+                    (await client.post("/suggest-packages/prompt", json={"user_id": "bench", "prompt": prompt})).raise_for_status()
+                    timings[stage] = time.perf_counter() - start
+
+asyncio.run(probe())
+print(json.dumps(timings))
+"""
+
+
+def run_probe(env: dict, llm: bool) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, "llm" if llm else "plain"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--preload", action="store_true", help="build LLM clients during startup")
+    parser.add_argument("--no-secrets", action="store_true", help="start without OPENAI_API_KEY/DATABASE_URL/SECRET_KEY")
+    args = parser.parse_args()
+
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "DATABASE_URL", "SECRET_KEY")}
+    env.update(LOG_LEVEL="WARNING", LLM_PRELOAD=str(args.preload).lower(), JOBS_WORKERS="0")
+    llm = not args.no_secrets
+    if llm:
+        port = free_port()
+        serve_in_thread(create_app(latency=0.05, token_rate=1e6), port)
+        env.update(
+            OPENAI_BASE_URL=f"http://127.0.0.1:{port}/v1",
+            OPENAI_API_KEY="sk-fake",
+            DATABASE_URL=f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}",
+            SECRET_KEY="bench-secret",
+        )
+
+    runs = [run_probe(env, llm) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts (median / max), preload={args.preload}, secrets={llm}")
+    for stage in STAGES:
+        values = [run[stage] for run in runs if stage in run]
+        if values:
+            print(f"  {stage:<20} {statistics.median(values) * 1000:7.0f}ms  {max(values) * 1000:7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
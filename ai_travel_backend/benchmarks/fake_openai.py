@@ -0,0 +1,201 @@
+# Minimal stand-in for the OpenAI chat completions API.
+#
+#   python -m benchmarks.fake_openai --port 9100 --latency 2.0 --token-rate 50
+#
+# Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHARS_PER_TOKEN = 4
+
+
+def sample_packages(days: int = 3, packages: int = 3) -> dict:
+    return {
+        "packages": [
+            {
+                "package_id": f"pkg-{p + 1}",
+                "title": f"Sample Package {p + 1}",
+                "days": [
+                    {
+                        "day": d + 1,
+                        "date": None,
+                        "activities": [
+                            {"time": "09:00 AM", "place": "Old Town", "activity": "Walking tour", "cost": "$20"},
+                            {"time": "01:00 PM", "place": "Market", "activity": "Lunch", "cost": "$15"},
+                        ],
+                    }
+                    for d in range(days)
+                ],
+                "total_cost_estimate": "$700",
+                "accommodation": {"name": "Hotel Sample", "cost_per_night": "$100", "amenities": ["WiFi"]},
+                "local_transport": ["Taxi", "Metro"],
+                "visa_required": False,
+                "notes": "Generated by the fake OpenAI server",
+            }
+            for p in range(packages)
+        ]
+    }
+
+
+# Recognises the backend's prompt shapes well enough to return a reply of
+# the right structure.
+def reply_for(prompt: str, days: int) -> str:
+    if "travel intent" in prompt:
+        return json.dumps({
+            "destination": "Sample City", "mood": "relaxing", "interests": ["beach", "food"],
+            "travel_type": "couple", "duration_days": days, "preferred_month": None, "budget": None,
+        })
+    if "one-sentence theme" in prompt:
+        return json.dumps({"packages": [{"title": f"Sample Package {p + 1}", "theme": "Sample theme"} for p in range(3)]})
+    if "Rewrite one day" in prompt:
+        return json.dumps(sample_packages(days=1, packages=1)["packages"][0]["days"][0])
+    if "Replace activity" in prompt:
+        return json.dumps(sample_packages(days=1, packages=1)["packages"][0]["days"][0]["activities"][0])
+    if "single package" in prompt:
+        return json.dumps(sample_packages(days=days, packages=1)["packages"][0])
+    return json.dumps(sample_packages(days=days))
+
+
+# The kinds of broken output real models produce
+def malform(body: str, rng: random.Random) -> str:
+    kind = rng.choice(["fenced", "trailing_comma", "truncated", "prose"])
+    if kind == "fenced":
+        return f"```json\n{body}\n```"
+    if kind == "trailing_comma":
+        return body.replace("]", ",]", 1)
+    if kind == "truncated":
+        return body[: int(len(body) * 0.7)]
+    return "I'm sorry, I can't help with that trip."
+
+
+def create_app(
+    latency: float = 1.0,
+    days: int = 3,
+    token_rate: float = 200.0,
+    malformed_rate: float = 0.0,
+    chunk_chars: int = 40,
+    seed: int = None,
+    error_rate: float = 0.0,
+    tail_rate: float = 0.0,
+    tail_latency: float = 10.0,
+) -> FastAPI:
+    # latency is the time to first token; the body then arrives at
+    # token_rate tokens per second (streamed in chunk_chars pieces).
+    # error_rate of requests fail with a 503; tail_rate of requests take
+    # tail_latency to first token instead (for hedging and timeouts).
+    app = FastAPI(title="Fake OpenAI")
+    rng = random.Random(seed)
+    chunk_delay = chunk_chars / CHARS_PER_TOKEN / token_rate
+
+    async def stream(model: str, body: str, finish_reason: str, delay: float):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        await asyncio.sleep(delay)
+        for start in range(0, len(body), chunk_chars):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": body[start:start + chunk_chars]}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(chunk_delay)
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        if error_rate and rng.random() < error_rate:
+            return JSONResponse({"error": {"message": "stub overloaded", "type": "server_error"}}, status_code=503)
+        delay = tail_latency if tail_rate and rng.random() < tail_rate else latency
+        prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages", []))
+        body = reply_for(prompt, days)
+        if malformed_rate and rng.random() < malformed_rate:
+            body = malform(body, rng)
+        finish_reason = "stop"
+        max_tokens = payload.get("max_tokens")
+        if max_tokens and len(body) > max_tokens * CHARS_PER_TOKEN:
+            body, finish_reason = body[: max_tokens * CHARS_PER_TOKEN], "length"
+        if payload.get("stream"):
+            return StreamingResponse(
+                stream(payload.get("model", "gpt-4"), body, finish_reason, delay), media_type="text/event-stream"
+            )
+
+        prompt_tokens = len(prompt) // CHARS_PER_TOKEN
+        completion_tokens = len(body) // CHARS_PER_TOKEN
+        await asyncio.sleep(delay + completion_tokens / token_rate)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": body},
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def serve_in_thread(app: FastAPI, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds to first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="completion tokens per second")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of replies that are broken")
+    parser.add_argument("--days", type=int, default=3, help="days per generated package")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fraction of requests that are slow")
+    parser.add_argument("--tail-latency", type=float, default=10.0, help="seconds to first token for slow requests")
+    args = parser.parse_args()
+    app = create_app(
+        latency=args.latency,
+        days=args.days,
+        token_rate=args.token_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+        error_rate=args.error_rate,
+        tail_rate=args.tail_rate,
+        tail_latency=args.tail_latency,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
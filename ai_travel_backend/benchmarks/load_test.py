@@ -0,0 +1,176 @@
+# End-to-end load test: runs app.main:app under uvicorn against the stub
+# LLM server and SQLite (or a local Postgres via --database-url), then
+# drives register -> login -> profile -> suggest -> save -> list flows.
+#
+#   python -m benchmarks.load_test --users 200 --concurrency 50 --llm-latency 2
+#   python -m benchmarks.load_test --stages suggest --suggest prompt --malformed-rate 0.1
+#
+# Reports throughput plus p50/p95/p99 per stage.
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import free_port, percentile, start_process
+
+STAGES = ["register", "login", "profile", "suggest", "save", "list"]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def timed(self, stage, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies[stage].append(time.perf_counter() - start)
+        if not ok:
+            self.errors[stage] += 1
+        return response if ok else None
+
+    def report(self, elapsed, flows):
+        requests = sum(len(v) for v in self.latencies.values())
+        print(f"\n{flows} flows / {requests} requests in {elapsed:.2f}s: "
+              f"{flows / elapsed:.1f} flows/s, {requests / elapsed:.1f} req/s\n")
+        print(f"{'stage':<10} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for stage in STAGES:
+            values = self.latencies.get(stage)
+            if not values:
+                continue
+            print(
+                f"{stage:<10} {len(values):>6} {self.errors[stage]:>6} "
+                f"{statistics.median(values) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+                f"{percentile(values, 99) * 1000:>9.1f} {max(values) * 1000:>9.1f}"
+            )
+
+
+def suggest_body(args, user_id, index):
+    if args.suggest == "prompt":
+        return "/suggest-packages/prompt", {"user_id": user_id, "prompt": f"Relaxing {args.days}-day beach trip #{index}"}
+    # --distinct-destinations controls how often filter requests repeat
+    destination = f"City {index % args.distinct_destinations}"
+    return "/suggest-packages/filters", {
+        "user_id": user_id,
+        "from_date": "2025-06-01",
+        "to_date": f"2025-06-{args.days:02d}",
+        "destination": destination,
+        "budget": "mid",
+        "travel_type": "relaxed",
+    }
+
+
+async def flow(client, recorder, args, run_id, index):
+    email = f"bench-{run_id}-{index}@example.com"
+    stages = args.stages
+    headers = {}
+
+    if "register" in stages:
+        await recorder.timed("register", client.post("/auth/register", json={"email": email, "password": "secret"}))
+    if "login" in stages:
+        response = await recorder.timed("login", client.post("/auth/login", json={"email": email, "password": "secret"}))
+        if response is not None:
+            headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    if "profile" in stages:
+        profile = {
+            "user_id": email, "name": "Bench User", "email": email, "nationality": "IN",
+            "country_of_residence": "IN", "passport_number": None, "passport_expiry": None,
+            "interests": ["beach", "food"], "preferred_languages": ["English"],
+        }
+        await recorder.timed("profile", client.post("/user/profile", json=profile, headers=headers))
+    package = None
+    if "suggest" in stages:
+        path, body = suggest_body(args, email, index)
+        response = await recorder.timed("suggest", client.post(path, json=body, headers=headers))
+        if response is not None:
+            package = response.json()["packages"][0]
+    if "save" in stages and package is not None:
+        await recorder.timed("save", client.post("/itinerary/save", json={"user_id": email, "selected_package": package}))
+    if "list" in stages:
+        await recorder.timed("list", client.get(f"/itinerary/{email}"))
+
+
+async def drive(base_url, args):
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    slots = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        async def one(index):
+            async with slots:
+                await flow(client, recorder, args, run_id, index)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - start
+
+    recorder.report(elapsed, args.users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test")
+    parser.add_argument("--users", type=int, default=100, help="number of flows to run")
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--stages", type=lambda s: s.split(","), default=STAGES,
+                        help="comma-separated subset of " + ",".join(STAGES))
+    parser.add_argument("--suggest", choices=["filters", "prompt"], default="filters")
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--distinct-destinations", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="stub seconds to first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="stub completion tokens per second")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--database-url", default=None, help="defaults to a throwaway SQLite file")
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra settings for the app, e.g. CACHE_ENABLED=false")
+    args = parser.parse_args()
+
+    llm_port, app_port = free_port(), free_port()
+    database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'load_test.db')}"
+    app_env = {
+        "OPENAI_API_KEY": "sk-fake",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "DATABASE_URL": database_url,
+        "SECRET_KEY": "load-test-secret",
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        **dict(item.split("=", 1) for item in args.app_env),
+    }
+
+    processes = []
+    try:
+        processes.append(start_process(
+            ["-m", "benchmarks.fake_openai", "--port", str(llm_port), "--latency", str(args.llm_latency),
+             "--token-rate", str(args.token_rate), "--malformed-rate", str(args.malformed_rate),
+             "--days", str(args.days)],
+            ready_url=f"http://127.0.0.1:{llm_port}/docs",
+        ))
+        start_process(["init_database.py"], env=app_env).wait()
+        processes.append(start_process(
+            ["-m", "uvicorn", "app.main:app", "--port", str(app_port), "--workers", str(args.workers),
+             "--log-level", "warning"],
+            env=app_env,
+            ready_url=f"http://127.0.0.1:{app_port}/docs",
+        ))
+        asyncio.run(drive(f"http://127.0.0.1:{app_port}", args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
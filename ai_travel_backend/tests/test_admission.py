@@ -0,0 +1,176 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.api.auth_api import create_access_token
+from app.core.config import settings
+from app.dependencies.admission import get_admission_key
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def controller(**overrides) -> AdmissionController:
+    options = dict(
+        max_active=1, max_queued=100, max_wait=1.0,
+        user_rate_per_minute=6000, user_burst=100, user_max_pending=10,
+    )
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+def assert_idle(admission: AdmissionController):
+    assert admission.active() == 0
+    assert admission.queued() == 0
+    assert admission._pending == {}
+
+
+def test_queue_is_served_round_robin_across_users():
+    async def run():
+        admission = controller()
+        order = []
+
+        async def job(user, i):
+            slot = await admission.acquire(user)
+            order.append((user, i))
+            await asyncio.sleep(0.01)
+            slot.release()
+
+        tasks = [asyncio.create_task(job("a", i)) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(job("b", i)) for i in range(2)]
+        await asyncio.gather(*tasks)
+        return admission, order
+
+    admission, order = asyncio.run(run())
+    assert order == [("a", 0), ("a", 1), ("b", 0), ("a", 2), ("b", 1), ("a", 3)]
+    assert_idle(admission)
+
+
+def test_per_user_rate_and_pending_limits():
+    async def run():
+        admission = controller(max_active=10, user_rate_per_minute=60, user_burst=2, user_max_pending=2)
+        first = await admission.acquire("a")
+        second = await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as pending:
+            await admission.acquire("a")
+        first.release()
+        second.release()
+        with pytest.raises(AdmissionRejected) as rate:
+            await admission.acquire("a")
+        other = await admission.acquire("b")
+        other.release()
+        return admission, pending.value, rate.value
+
+    admission, pending, rate = asyncio.run(run())
+    assert pending.reason == "user_pending"
+    assert rate.reason == "user_rate"
+    assert 0 < rate.retry_after <= 1
+    assert_idle(admission)
+
+
+def test_queued_request_times_out():
+    async def run():
+        admission = controller(max_wait=0.05)
+        slot = await admission.acquire("a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("b")
+        assert admission.queued() == 0
+        slot.release()
+        return admission, rejected.value
+
+    admission, rejected = asyncio.run(run())
+    assert rejected.reason == "wait_timeout"
+    assert_idle(admission)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        admission = controller()
+        slot = await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        slot.release()
+        slot.release()  # idempotent
+        return admission
+
+    assert_idle(asyncio.run(run()))
+
+
+def test_slot_granted_as_the_wait_times_out_is_released(monkeypatch):
+    async def run():
+        admission = controller()
+        slot = await admission.acquire("a")
+        real_wait_for = asyncio.wait_for
+
+        async def granted_then_timeout(future, timeout):
+            slot.release()  # dispatch grants the waiting future...
+            assert future.done() and not future.cancelled()
+            raise asyncio.TimeoutError  # ...in the same iteration the wait times out
+
+        monkeypatch.setattr(asyncio, "wait_for", granted_then_timeout)
+        try:
+            with pytest.raises(AdmissionRejected):
+                await admission.acquire("b")
+        finally:
+            monkeypatch.setattr(asyncio, "wait_for", real_wait_for)
+        return admission
+
+    assert_idle(asyncio.run(run()))
+
+
+def test_batch_items_skip_per_user_limits_but_share_the_global_cap():
+    async def run():
+        admission = controller(max_active=2, user_rate_per_minute=1, user_burst=1, user_max_pending=1)
+        order = []
+
+        async def item(user, i):
+            slot = await admission.acquire(user, batch=True)
+            order.append((user, i))
+            await asyncio.sleep(0.01)
+            slot.release()
+
+        async def interactive():
+            slot = await admission.acquire("b")
+            order.append(("b", 0))
+            slot.release()
+
+        tasks = [asyncio.create_task(item("partner", i)) for i in range(5)]
+        await asyncio.sleep(0)
+        assert admission.active() == 2
+        tasks.append(asyncio.create_task(interactive()))
+        await asyncio.gather(*tasks)
+        return admission, order
+
+    admission, order = asyncio.run(run())
+    assert len(order) == 6
+    # Takes turns with the partner's queued items instead of waiting behind them
+    assert order.index(("b", 0)) < order.index(("partner", 3))
+    assert_idle(admission)
+
+
+def test_admission_key_falls_back_to_the_client_address(monkeypatch):
+    monkeypatch.setattr(settings, "secret_key", "test-secret")
+    monkeypatch.setattr(settings, "database_url", None)  # the key never needs the database
+    app = FastAPI()
+
+    @app.get("/key")
+    async def key(caller: str = Depends(get_admission_key)):
+        return caller
+
+    async def keys(*headers):
+        transport = httpx.ASGITransport(app=app, client=("10.0.0.1", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [(await client.get("/key", headers=h)).json() for h in headers]
+
+    valid = create_access_token(data={"sub": "alice"})
+    expired = create_access_token(data={"sub": "alice"}, expires_delta=-timedelta(minutes=1))
+    assert asyncio.run(keys(
+        {"Authorization": f"Bearer {valid}"},
+        {},
+        {"Authorization": "Bearer undefined"},
+        {"Authorization": f"Bearer {expired}"},
+    )) == ["user:alice", "ip:10.0.0.1", "ip:10.0.0.1", "ip:10.0.0.1"]
@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.auth_api import create_access_token, router as auth_router
+from app.api.user_api import router as user_router
+from app.core.config import settings
+from app.db.db import get_db
+from app.db.models import User
+from app.services.password_service import password_service
+
+EMAIL = "admin@example.com"
+
+
+@pytest.fixture(autouse=True)
+def auth_settings(monkeypatch):
+    monkeypatch.setattr(settings, "secret_key", "test-secret")
+    monkeypatch.setattr(settings, "admin_user_ids", EMAIL)
+    monkeypatch.setattr(settings, "auth_trust_token_claims", False)
+
+
+async def call(get_db_override, method, url, **kwargs):
+    app = FastAPI()
+    app.include_router(auth_router)
+    app.include_router(user_router)
+    app.dependency_overrides[get_db] = get_db_override
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.request(method, url, **kwargs)
+
+
+def with_user(*requests):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(User.__table__.create)
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            session.add(User(
+                user_id=EMAIL, username=EMAIL, email=EMAIL, name="", nationality="",
+                password_hash=password_service.hash_sync("right-password"),
+            ))
+            await session.commit()
+
+        async def db():
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                yield session
+
+        try:
+            return [await call(db, *request[:2], **(request[2] if len(request) > 2 else {})) for request in requests]
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_wrong_password_is_rejected():
+    right, wrong, unknown = with_user(
+        ("POST", "/auth/login", {"json": {"email": EMAIL, "password": "right-password"}}),
+        ("POST", "/auth/login", {"json": {"email": EMAIL, "password": "wrong-password"}}),
+        ("POST", "/auth/login", {"json": {"email": "nobody@example.com", "password": "x"}}),
+    )
+    assert right.status_code == 200 and right.json()["access_token"]
+    assert wrong.status_code == 401
+    assert unknown.status_code == 401
+
+
+def test_fallback_claim_token_is_rejected():
+    fallback = create_access_token(data={"sub": EMAIL, "fallback": True})
+    (response,) = with_user(("GET", "/users", {"headers": {"Authorization": f"Bearer {fallback}"}}))
+    assert response.status_code == 401
+
+
+def test_login_without_a_database_mints_no_token():
+    class Unavailable:
+        async def execute(self, *args, **kwargs):
+            raise ConnectionRefusedError("database down")
+
+    async def db():
+        yield Unavailable()
+
+    response = asyncio.run(call(db, "POST", "/auth/login", json={"email": EMAIL, "password": "x"}))
+    assert response.status_code == 503
+    assert "access_token" not in response.json()
@@ -0,0 +1,37 @@
+import asyncio
+
+from app.models.itinerary import PackageResponse
+from app.services.cache import InMemoryCacheBackend, ResponseCache
+from app.services.similarity_cache import PromptIndex
+
+
+def test_invalid_entry_is_dropped_and_counted_as_a_miss():
+    async def run():
+        backend = InMemoryCacheBackend()
+        cache = ResponseCache(backend, ttl=60)
+        await backend.set("stale", '{"packages": [{"title": "no other fields"}]}', 60)
+        await backend.set("garbled", "{not json", 60)
+        await cache.set("fresh", PackageResponse(packages=[]))
+        results = [await cache.get(key) for key in ("stale", "garbled", "fresh")]
+        return cache, backend, results
+
+    cache, backend, (stale, garbled, fresh) = asyncio.run(run())
+    assert stale is None and garbled is None
+    assert fresh == PackageResponse(packages=[])
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert asyncio.run(backend.size()) == 1
+
+
+def test_prompt_index_forgets_scopes_whose_rows_were_overwritten():
+    index = PromptIndex(dim=64, max_entries=3)
+    responses = [PackageResponse(packages=[]) for _ in range(50)]
+    for i, response in enumerate(responses):
+        index.add("beach week", f"scope-{i}", response)
+    assert len(index) == 3
+    assert sorted(index._scope_ids) == ["scope-47", "scope-48", "scope-49"]
+    assert index.search("beach week", "scope-0") == []
+    assert index.search("beach week", "scope-49")[0][1] is responses[49]
+
+    index.add("beach week", "shared", responses[0])
+    index.add("beach week", "shared", responses[1])
+    assert sorted(index._scope_ids) == ["scope-49", "shared"]
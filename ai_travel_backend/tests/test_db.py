@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.metrics import request_spans_var
+from app.db.db import _instrument
+
+
+def test_failed_statements_leave_no_timer_state_on_the_connection():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        _instrument(engine)
+        spans = []
+        request_spans_var.set(spans)
+        try:
+            async with engine.connect() as conn:
+                for _ in range(3):
+                    with pytest.raises(OperationalError):
+                        await conn.execute(text("SELECT * FROM missing"))
+                await conn.execute(text("SELECT 1"))
+                info = dict((await conn.get_raw_connection()).info)
+        finally:
+            await engine.dispose()
+        return spans, info
+
+    spans, info = asyncio.run(run())
+    assert [name for name, _ in spans] == ["db.execute"]
+    assert "query_start" not in info
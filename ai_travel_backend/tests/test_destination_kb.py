@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.destination_kb import Destination, budget_band, budget_per_day
+
+PARIS = Destination(
+    name="Paris",
+    country="France",
+    climate=("mild",) * 12,
+    transport=("Metro",),
+    costs={
+        "budget": {"hotel_per_night": "$80-120", "daily": "$50-80"},
+        "mid": {"hotel_per_night": "$150-250", "daily": "$100-150"},
+        "luxury": {"hotel_per_night": "$450+", "daily": "$250+"},
+    },
+)
+
+
+@pytest.mark.parametrize("budget, band", [
+    ("mid-range budget", "mid"),
+    ("medium budget", "mid"),
+    ("Moderate", "mid"),
+    ("low", "budget"),
+    ("cheap and cheerful", "budget"),
+    ("backpacking", "budget"),
+    ("luxury", "luxury"),
+    ("high", "luxury"),
+    ("not too high", None),
+    ("no luxury", None),
+    ("highlights only", None),
+    ("flexible", None),
+    ("", None),
+])
+def test_budget_band_matches_whole_words(budget, band):
+    assert budget_band(budget) == band
+
+
+@pytest.mark.parametrize("budget, days, per_day", [
+    ("$2000", 5, 400),
+    ("2,000 USD", 4, 500),
+    ("€1.5k", 5, 300),
+    ("$150 a day", 5, 150),
+    ("300 per night", None, 300),
+    ("$2000", None, None),
+    ("3 star hotels", 5, None),
+    ("2 adults, $3000 total", 5, 600),
+    ("4 nights, 2,000 euros", 4, 500),
+    ("150 people max, $4000", 4, 1000),
+    ("medium", 5, None),
+])
+def test_budget_per_day(budget, days, per_day):
+    assert budget_per_day(budget, days) == per_day
+
+
+def test_cost_band_uses_amounts_and_leaves_unknown_budgets_out():
+    assert PARIS.cost_band("$600", 5) == PARIS.costs["budget"]  # $120/day
+    assert PARIS.cost_band("$2000", 5) == PARIS.costs["mid"]  # $400/day
+    assert PARIS.cost_band("$800 per day") == PARIS.costs["luxury"]
+    assert PARIS.cost_band("mid-range budget") == PARIS.costs["mid"]
+    assert PARIS.cost_band("not too high", 5) is None
+    assert PARIS.cost_band("$2000") is None
@@ -0,0 +1,40 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.models.itinerary import PackagePlan
+from app.services import itinerary_fanout, itinerary_service
+from app.services.response_parser import ResponseParseError
+
+
+def planner_reply(monkeypatch, content):
+    async def ainvoke_chat(messages, **options):
+        return SimpleNamespace(content=content)
+
+    monkeypatch.setattr(itinerary_fanout, "ainvoke_chat", ainvoke_chat)
+
+
+@pytest.mark.parametrize("content", [
+    '{"packages":[{"theme":"beaches"},{"title":"B"},{"title":"C"}]}',
+    '{"packages":[{"title":"A"},{"title":"B"}]}',
+    '{"packages":"three"}',
+    "no json here",
+])
+def test_unusable_planner_output_is_a_parse_error(monkeypatch, content):
+    planner_reply(monkeypatch, content)
+    with pytest.raises(ResponseParseError):
+        asyncio.run(itinerary_fanout.plan_packages("- Destination: Rome"))
+
+
+def test_planner_output_is_validated(monkeypatch):
+    planner_reply(monkeypatch, '[{"title":"A","theme":"food"},{"title":"B"},{"title":"C"},{"title":"D"}]')
+    plans = asyncio.run(itinerary_fanout.plan_packages("- Destination: Rome"))
+    assert plans == [PackagePlan(title="A", theme="food"), PackagePlan(title="B"), PackagePlan(title="C")]
+
+
+def test_unusable_plans_fall_back_to_a_single_call(monkeypatch):
+    planner_reply(monkeypatch, '{"packages":[{"theme":"no title"}]}')
+    monkeypatch.setattr(settings, "llm_fanout_enabled", True)
+    assert asyncio.run(itinerary_service._fanout_plans("- Destination: Rome")) is None
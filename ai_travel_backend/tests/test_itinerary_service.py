@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.models.user import Principal
+from app.services import itinerary_service
+from app.services.user_cache import PrincipalCache
+
+
+class Session:
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.queries = 0
+
+    def __call__(self):
+        if isinstance(self.outcome, RuntimeError):
+            raise self.outcome  # get_engine() without DATABASE_URL
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement):
+        self.queries += 1
+        if isinstance(self.outcome, BaseException):
+            raise self.outcome
+        return self
+
+    def one_or_none(self):
+        return self.outcome
+
+
+@pytest.fixture
+def principals(monkeypatch):
+    cache = PrincipalCache(ttl=60, max_entries=100)
+    monkeypatch.setattr(itinerary_service, "principal_cache", cache)
+    return cache
+
+
+@pytest.mark.parametrize("error", [
+    OperationalError("SELECT", {}, Exception("server closed the connection")),
+    ConnectionRefusedError("connection refused"),
+    asyncio.TimeoutError(),
+    RuntimeError("DATABASE_URL is not set"),
+])
+def test_nationality_is_unknown_when_the_database_is_unavailable(monkeypatch, principals, error):
+    monkeypatch.setattr(itinerary_service, "AsyncSessionLocal", Session(error))
+    assert asyncio.run(itinerary_service._traveller_nationality("alice")) is None
+
+
+def test_nationality_is_looked_up_once_then_cached(monkeypatch, principals):
+    row = Principal(user_id="alice", email="alice@example.com", nationality="India")
+    session = Session(type("Row", (), {"_mapping": row.model_dump()})())
+    monkeypatch.setattr(itinerary_service, "AsyncSessionLocal", session)
+
+    async def lookups():
+        return [await itinerary_service._traveller_nationality("alice") for _ in range(3)]
+
+    assert asyncio.run(lookups()) == ["India"] * 3
+    assert session.queries == 1
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.db import AsyncSessionLocal
+from app.db.models import ItineraryJob
+from app.services.job_queue import DatabaseJobBroker
+
+
+@pytest.fixture
+def database(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    previous = AsyncSessionLocal.kw.get("bind")
+    AsyncSessionLocal.configure(bind=engine)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(ItineraryJob.__table__.create)
+
+    asyncio.run(create())
+    yield engine
+    AsyncSessionLocal.configure(bind=previous)
+    asyncio.run(engine.dispose())
+
+
+def test_finish_updates_the_job_the_callback_reports(database):
+    async def run():
+        broker = DatabaseJobBroker(max_queued=10, poll_interval=0.01, lease=60)
+        await broker.submit("prompt", {"prompt": "3 days in Rome"})
+        job = await broker.claim(timeout=0)
+        await broker.finish(job, "succeeded", result={"packages": []})
+        return job, await broker.get(job.id)
+
+    job, stored = asyncio.run(run())
+    assert (job.status, job.result, job.error) == ("succeeded", {"packages": []}, None)
+    assert job.to_status().status == "succeeded" and job.finished_at is not None
+    assert stored.status == "succeeded"
+
+
+def test_running_job_with_an_expired_lease_is_reclaimed(database):
+    async def run():
+        broker = DatabaseJobBroker(max_queued=10, poll_interval=0.01, lease=0.2)
+        await broker.submit("prompt", {"prompt": "3 days in Rome"})
+        crashed = await broker.claim(timeout=0)
+        assert await broker.claim(timeout=0) is None  # lease still held
+
+        renewed_broker = DatabaseJobBroker(max_queued=10, poll_interval=0.01, lease=60)
+        await renewed_broker.submit("prompt", {"prompt": "4 days in Paris"})
+        alive = await renewed_broker.claim(timeout=0)
+
+        await asyncio.sleep(0.3)
+        await broker.renew(alive)  # the healthy worker keeps its lease
+        reclaimed = await broker.claim(timeout=0.5)
+        again = await broker.claim(timeout=0)
+        return crashed, alive, reclaimed, again
+
+    crashed, alive, reclaimed, again = asyncio.run(run())
+    assert reclaimed.id == crashed.id and reclaimed.status == "running"
+    assert again is None  # the renewed job was left alone
+    assert alive.id != crashed.id
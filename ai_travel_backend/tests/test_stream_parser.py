@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.itinerary import Package
+from app.services.response_parser import ResponseParseError, parse_package_response, repair_json
+from app.services.stream_parser import PackageStreamParser
+
+CORPUS = Path(__file__).parent.parent / "benchmarks" / "corpus" / "responses"
+
+
+def streamed(text, chunk=7):
+    parser = PackageStreamParser(repair=repair_json)
+    packages = []
+    for start in range(0, len(text), chunk):
+        for item in parser.feed(text[start:start + chunk]):
+            try:
+                packages.append(Package.model_validate(item))
+            except ValidationError:
+                continue
+    return packages
+
+
+@pytest.mark.parametrize("path", sorted(CORPUS.iterdir()), ids=lambda path: path.name)
+def test_streamed_packages_match_the_full_parse(path):
+    text = path.read_text()
+    try:
+        expected = parse_package_response(text).packages
+    except ResponseParseError:
+        expected = []
+    assert streamed(text) == expected